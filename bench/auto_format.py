@@ -0,0 +1,52 @@
+# python $0 [number]
+"""Compare the cost of automatic ('a') formatting with explicit decimal ('d')
+and binary ('i') formatting, across the values in the hardcases data
+"""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+
+import os
+import sys
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[0:0] = [os.path.join(HERE, '..'), os.path.join(HERE, '..', 'tests')]
+
+import bytesize
+from data_for_hardcases import hardcases
+
+SPECS = ['{:a}', '{:d}', '{:i}', '{:la}', '{:li}', '{:sa}', '{:sd}', '{:si}']
+
+
+def formattable(spec):
+    values = []
+    for b, _ in hardcases:
+        try:
+            spec.format(bytesize.Quantity(b))
+        except bytesize.UnitNoExistError:
+            continue
+        values.append(b)
+    return values
+
+
+def main(number):
+    # use the same values for every spec
+    values = set(formattable('{:a}'))
+    for spec in SPECS:
+        values &= set(formattable(spec))
+    values = [bytesize.Quantity(b) for b in sorted(values)]
+
+    # interleave the specs so that each sees the same conditions
+    best = dict((spec, float('inf')) for spec in SPECS)
+    for _ in range(7):
+        for spec in SPECS:
+            def run(spec=spec):
+                for value in values:
+                    spec.format(value)
+            best[spec] = min(best[spec], timeit.timeit(run, number=number))
+
+    for spec in SPECS:
+        print("{:8} {:8.3f} us/value".format(spec, 1e6 * best[spec] / number / len(values)))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if sys.argv[1:] else 100)
@@ -0,0 +1,57 @@
+# python $0 [megabytes]
+"""Measure the throughput of the ``bytesize`` command on a file of sizes and
+paths made from the hardcases data, with one process and with more
+"""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[0:0] = [os.path.join(HERE, '..'), os.path.join(HERE, '..', 'tests')]
+
+from data_for_hardcases import hardcases
+
+
+def write_input(ff, megabytes):
+    rng = random.Random(1984)
+    values = [b for b, _ in hardcases if b < 10**27]
+    lines = ['{}\t./dir{}/file{}.dat\n'.format(rng.choice(values), ii % 97, ii).encode('ascii')
+             for ii in range(100000)]
+    block = b''.join(lines)
+    for _ in range(max(1, megabytes * 2**20 // len(block))):
+        ff.write(block)
+    ff.flush()
+
+
+def throughput(path, argv):
+    env = dict(os.environ, PYTHONPATH=os.path.join(HERE, '..'))
+    with open(os.devnull, 'wb') as devnull:
+        t0 = time.time()
+        subprocess.check_call([sys.executable, '-m', 'bytesize'] + argv + [path],
+                              stdout=devnull, env=env)
+        elapsed = time.time() - t0
+    return os.path.getsize(path) / elapsed / 2**20
+
+
+def main(megabytes=64):
+    cpus = multiprocessing.cpu_count()
+    jobs = sorted(set([1, 2, 4, cpus]) & set(range(1, cpus + 1)))
+    with tempfile.NamedTemporaryFile(suffix='.txt') as ff:
+        write_input(ff, megabytes)
+        print("{} MiB input, {} CPUs".format(os.path.getsize(ff.name) // 2**20, cpus))
+        for mode in (['--format', 'd'], ['--format', '>10.6i'], ['--invalid', 'ignore', '-f', '1-']):
+            for jobs_ in jobs:
+                argv = mode + ['--jobs', str(jobs_)]
+                print("{:40} {:8.1f} MiB/s".format(' '.join(argv), throughput(ff.name, argv)))
+                sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
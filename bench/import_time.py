@@ -0,0 +1,39 @@
+# python $0 [runs]
+"""Measure how long `import bytesize` takes in a fresh interpreter, and how
+much more it takes when pint is imported and the unit registry is built
+"""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+
+import os
+import subprocess
+import sys
+
+STATEMENTS = [
+    ('python only', 'pass'),
+    ('import bytesize', 'import bytesize'),
+    ('... and format', 'import bytesize; bytesize.formatter()(1400605)'),
+    ('... and parse', 'import bytesize; bytesize.Quantity("200 MiB")'),
+    ('... and build _ureg', 'import bytesize; bytesize._ureg and bytesize._ureg("1 B")'),
+]
+
+
+def time_statement(statement, runs):
+    timer = 'import time; t0 = time.time(); {}; print(time.time() - t0)'.format(statement)
+    path = [os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(path + sys.path[1:]))
+    times = []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, '-c', timer], env=env)
+        times.append(float(output))
+    times.sort()
+    return times[len(times) // 2]
+
+
+def main(runs):
+    for label, statement in STATEMENTS:
+        print("{:22} {:8.2f} ms".format(label, 1000 * time_statement(statement, runs)))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if sys.argv[1:] else 20)
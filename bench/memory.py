@@ -0,0 +1,67 @@
+# python $0 [count]
+"""Measure the memory taken by each Quantity, with and without a per-instance
+`__dict__`, for distinct values and for common values that are shared, and
+by each value in a list of them and in a QuantityArray
+"""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bytesize import Quantity, QuantityArray
+
+
+class QuantityWithDict(Quantity):
+    """Like `Quantity` before it had `__slots__`"""
+
+
+def bytes_per_instance(make, values):
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        instances = [make(value) for value in values]
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # don't count the list itself
+    return max(0, after - before - sys.getsizeof(instances)) / len(instances)
+
+
+def bytes_per_value(make, values):
+    make(values[:1])  # e.g. import NumPy first
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        container = make(values)
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del container
+    return (after - before) / len(values)
+
+
+def main(count=100000):
+    rng = random.Random(1984)
+    distinct = [rng.randrange(2**20, 2**40) for _ in range(count)]
+    common = [rng.choice([1, 512, 1024, 4096, 10**6, 2**30]) for _ in range(count)]
+
+    print("{:24} {:>14} {:>14}".format('', 'distinct', 'common'))
+    for name, make in [('Quantity with __dict__', QuantityWithDict),
+                       ('Quantity', Quantity)]:
+        print("{:24} {:12.1f} B {:12.1f} B".format(
+            name, bytes_per_instance(make, distinct), bytes_per_instance(make, common)))
+
+    print()
+    for name, make in [('list of Quantity', lambda values: [Quantity(value) for value in values]),
+                       ('QuantityArray', QuantityArray)]:
+        print("{:24} {:12.1f} B {:12.1f} B".format(
+            name, bytes_per_value(make, distinct), bytes_per_value(make, common)))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
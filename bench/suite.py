@@ -0,0 +1,319 @@
+# python $0 [--save FILE] [--compare FILE] [--filter TEXT] [--seconds N]
+"""Benchmarks for the hot paths: formatting, parsing and arithmetic.
+
+Each benchmark runs over two distributions of values: the values in the
+hardcases data (every unit boundary, give or take one), and a seeded
+log-normal distribution resembling the sizes of files on a typical disk.
+
+For each benchmark we print calls per second and the peak memory traced by
+:mod:`tracemalloc` during a single call, which approximates how much each
+call allocates. With ``--compare``, we also print the speed relative to a
+baseline saved earlier with ``--save``.
+"""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+
+import argparse
+import io
+import json
+import math
+import os
+import random
+import struct
+import sys
+import timeit
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[0:0] = [os.path.join(HERE, '..'), os.path.join(HERE, '..', 'tests')]
+
+import bytesize
+from bytesize import Quantity as Q
+from data_for_hardcases import hardcases
+
+
+def hardcases_values():
+    return [b for b, _ in hardcases]
+
+
+def file_size_values(count=2000):
+    # median around 8 KiB, with a long tail into the gigabytes
+    rng = random.Random(1984)
+    return [int(rng.lognormvariate(math.log(8192), 2.8)) for _ in range(count)]
+
+
+DISTRIBUTIONS = [
+    ('hardcases', hardcases_values),
+    ('file sizes', file_size_values),
+]
+
+BENCHMARKS = []
+
+
+def benchmark(name):
+    """Register a benchmark. The decorated function takes a list of ints and
+    returns ``(function, inputs)``; we time calling `function` on each of
+    `inputs`. Values the operation rejects are dropped.
+    """
+    def decorate(setup):
+        BENCHMARKS.append((name, setup))
+        return setup
+    return decorate
+
+
+def accepted(function, inputs):
+    ok = []
+    for value in inputs:
+        try:
+            function(value)
+        except (bytesize.UnitNoExistError, TypeError):
+            continue
+        ok.append(value)
+    return ok
+
+
+def chunks(values, spec, size=1000):
+    """The `values` that `spec` can format, in lists of `size`, so that no
+    chunk is dropped for one value out of range
+    """
+    values = accepted(lambda value: format(Q(value), spec), values)
+    return [values[ii:ii + size] for ii in range(0, len(values), size)]
+
+
+def value_count(inputs):
+    """The number of values in `inputs`, counting each value in a chunk or
+    packed in a buffer
+    """
+    return sum(len(input_) if isinstance(input_, list) else
+               len(input_) // 8 if isinstance(input_, bytes) else 1
+               for input_ in inputs)
+
+
+@benchmark("formatter()")
+def _(values):
+    fmt = bytesize.formatter()
+    return fmt, values
+
+
+@benchmark("formatter()(x) inline")
+def _(values):
+    return (lambda x: bytesize.formatter()(x)), values
+
+
+@benchmark("formatter(1000, abbrev=False)")
+def _(values):
+    return bytesize.formatter(base=1000, abbrev=False), values
+
+
+@benchmark("short_formatter()")
+def _(values):
+    return bytesize.short_formatter(), values
+
+
+@benchmark("short_formatter(base=1024)")
+def _(values):
+    return bytesize.short_formatter(base=1024), values
+
+
+for _spec in ('{}', '{:a}', '{:d}', '{:>10.6d}', '{:12li}', '{:s}', '{:7si}'):
+    @benchmark("'{}'.format(q)".format(_spec))
+    def _(values, spec=_spec):
+        return spec.format, [Q(value) for value in values]
+
+
+@benchmark("Quantity('N B')")
+def _(values):
+    return Q, ['{} B'.format(value) for value in values]
+
+
+@benchmark("Quantity('N.NNN kB')")
+def _(values):
+    return Q, ['{}.{:03} kB'.format(*divmod(value, 1000)) for value in values]
+
+
+@benchmark("Quantity('N kibibytes')")
+def _(values):
+    return Q, ['{} kibibytes'.format(value // 1024) for value in values]
+
+
+@benchmark("q + int")
+def _(values):
+    return (lambda q: q + 4096), [Q(value) for value in values]
+
+
+@benchmark("int + q")
+def _(values):
+    return (lambda q: 4096 + q), [Q(value) for value in values]
+
+
+@benchmark("q + q")
+def _(values):
+    return (lambda q: q + q), [Q(value) for value in values]
+
+
+@benchmark("q - q")
+def _(values):
+    return (lambda q: q - q), [Q(value) for value in values]
+
+
+@benchmark("q * int")
+def _(values):
+    return (lambda q: q * 3), [Q(value) for value in values]
+
+
+@benchmark("q // int")
+def _(values):
+    return (lambda q: q // 3), [Q(value) for value in values]
+
+
+@benchmark("sum(100 quantities)")
+def _(values):
+    chunks = [[Q(value) for value in values[ii:ii + 100]] for ii in range(0, len(values), 100)]
+    return sum, chunks
+
+
+@benchmark("total(100 quantities)")
+def _(values):
+    chunks = [[Q(value) for value in values[ii:ii + 100]] for ii in range(0, len(values), 100)]
+    return bytesize.total, chunks
+
+
+@benchmark("q.guess_base()")
+def _(values):
+    return (lambda q: q.guess_base()), [Q(value) for value in values]
+
+
+@benchmark("format_array(1000 values)")
+def _(values):
+    return bytesize.format_array, chunks(values, 'i')
+
+
+@benchmark("format_array(buffer, out)")
+def _(values):
+    values = [value for value in accepted(bytesize.formatter(), values) if value < 2**64]
+    buffers = [struct.pack('<{}Q'.format(len(values[ii:ii + 1000])), *values[ii:ii + 1000])
+               for ii in range(0, len(values), 1000)]
+
+    def write(buffer):
+        bytesize.format_array(bytesize.buffer_array(buffer), out=io.StringIO())
+    return write, buffers
+
+
+@benchmark("'\\n'.join(format, 1000 values)")
+def _(values):
+    quantity_chunks = [[Q(value) for value in chunk] for chunk in chunks(values, '>10.6d')]
+    return ((lambda chunk: io.StringIO().write('\n'.join(format(q, '>10.6d') for q in chunk))),
+            quantity_chunks)
+
+
+@benchmark("write_humanized(1000 values)")
+def _(values):
+    return ((lambda chunk: bytesize.write_humanized(io.StringIO(), chunk, '>10.6d')),
+            chunks(values, '>10.6d'))
+
+
+@benchmark("write_humanized(1000, bytes)")
+def _(values):
+    return ((lambda chunk: bytesize.write_humanized(io.BytesIO(), chunk, '>10.6d')),
+            chunks(values, '>10.6d'))
+
+
+@benchmark("measure, then '{:={w}}' (1000)")
+def _(values):
+    quantity_chunks = [[Q(value) for value in chunk] for chunk in chunks(values, '')]
+
+    def two_passes(chunk):
+        width = max(len(format(q, '')) for q in chunk)
+        return [format(q, '={}'.format(width)) for q in chunk]
+    return two_passes, quantity_chunks
+
+
+@benchmark("format_column(1000 values)")
+def _(values):
+    return bytesize.format_column, chunks(values, '')
+
+
+def measure(function, inputs, seconds):
+    def run():
+        for value in inputs:
+            function(value)
+
+    timer = timeit.Timer(run)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= seconds / 5:
+            break
+        number *= 2
+    best = min([elapsed] + timer.repeat(repeat=4, number=number))
+    return number * len(inputs) / best
+
+
+def peak_bytes(function, inputs):
+    """Median peak traced memory during one call"""
+    if tracemalloc is None or not hasattr(tracemalloc, 'reset_peak'):
+        return None
+    peaks = []
+    tracemalloc.start()
+    try:
+        for value in inputs[:200]:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            result = function(value)
+            _, peak = tracemalloc.get_traced_memory()
+            del result
+            peaks.append(peak - before)
+    finally:
+        tracemalloc.stop()
+    peaks.sort()
+    return peaks[len(peaks) // 2]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--save', metavar='FILE', help="save results as a baseline")
+    parser.add_argument('--compare', metavar='FILE', help="compare with a saved baseline")
+    parser.add_argument('--filter', metavar='TEXT', default='',
+                        help="only run benchmarks whose names contain TEXT")
+    parser.add_argument('--seconds', type=float, default=0.5,
+                        help="approximate time to spend on each measurement")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.compare and os.path.exists(args.compare):
+        with open(args.compare) as ff:
+            baseline = json.load(ff)
+
+    results = {}
+    print("{:32} {:11} {:>6} {:>12} {:>10} {:>10}".format(
+        'benchmark', 'values', 'used', 'calls/sec', 'peak B', 'vs. base'))
+    for name, setup in BENCHMARKS:
+        if args.filter not in name:
+            continue
+        for dist_name, dist in DISTRIBUTIONS:
+            function, inputs = setup(dist())
+            inputs = accepted(function, inputs)
+            if not inputs:
+                continue
+            rate = measure(function, inputs, args.seconds)
+            peak = peak_bytes(function, inputs)
+
+            key = '{} / {}'.format(name, dist_name)
+            results[key] = rate
+            ratio = '{:9.2f}x'.format(rate / baseline[key]) if key in baseline else ''
+            print("{:32} {:11} {:6} {:12,.0f} {:>10} {:>10}".format(
+                name, dist_name, value_count(inputs), rate, '' if peak is None else peak,
+                ratio))
+            sys.stdout.flush()
+
+    if args.save:
+        with open(args.save, 'w') as ff:
+            json.dump(results, ff, indent=1, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,11 +4,23 @@ from future.utils import PY2
 
 import os
 import sys
+import threading
+
+try:
+    from importlib.util import find_spec as _find_module
+except ImportError:  # Python 2
+    from pkgutil import find_loader as _find_module
 from fractions import Fraction
 import decimal
+import re
 import string
+from collections import namedtuple, OrderedDict
+from contextlib import contextmanager
 
-__all__ = ['Quantity', 'formatter', 'short_formatter']
+__all__ = ['Quantity', 'formatter', 'short_formatter', 'format_array', 'short_format_array',
+           'buffer_array', 'write_humanized', 'format_column', 'Decomposition',
+           'total', 'count', 'minimum', 'maximum', 'mean', 'summarize', 'Summary',
+           'disk_usage', 'walk_usage', 'QuantityArray']
 
 if PY2:
     def is_string(ss):
@@ -56,24 +68,99 @@ UNITS_TABLE = {
 }
 
 
+def _unit_suffixes():
+    suffixes = {}
+    for base, subtable in UNITS_TABLE.items():
+        for exp, (abbrev, prefix) in enumerate(subtable):
+            multiplier = base**exp
+            suffixes[abbrev + 'B'] = (multiplier, 1)
+            suffixes[abbrev + 'b'] = (multiplier, 8)
+            suffixes[prefix + 'byte'] = suffixes[prefix + 'bytes'] = (multiplier, 1)
+            suffixes[prefix + 'bit'] = suffixes[prefix + 'bits'] = (multiplier, 8)
+    return suffixes
+
+
+_UNIT_SUFFIXES = _unit_suffixes()
+"""Map each unit name, e.g. ``'MiB'`` or ``'kilobits'``, to ``(numerator,
+denominator)`` of its size in bytes."""
+
+_SIZE_RE = re.compile(r'\s*(-|\+)?(\d*)(?:\.(\d*))?(?:[eE]([-+]?\d+))?\s*([A-Za-z]+)\s*$')
+_SIZE_MAX_DIGITS = 400
+"""The most digits, counting the exponent, in a size `_parse_size` accepts.
+Beyond this, e.g. ``'1e9999999 B'``, the arithmetic alone takes seconds."""
+
+
+def _parse_size(text, suffixes=_UNIT_SUFFIXES):
+    """Parse `text`, e.g. ``'1.5 GiB'``, as an exact number of bytes.
+
+    :param suffixes: a table of units like `_UNIT_SUFFIXES`
+    :return: ``(numerator, denominator)``, or `None` if `text` isn't a
+             number followed by one of the units in `UNITS_TABLE`
+    :raises ValueError: if the number has more than `_SIZE_MAX_DIGITS`
+                        digits, counting its exponent
+    """
+    match = _SIZE_RE.match(text)
+    if match is None:
+        return None
+    sign, whole, frac, exp10, unit = match.groups()
+    if not (whole or frac):
+        return None
+    try:
+        numerator, denominator = suffixes[unit]
+    except KeyError:
+        return None
+
+    frac = frac or ''
+    exp10 = int(exp10) if exp10 else 0
+    if len(whole) + len(frac) + abs(exp10) > _SIZE_MAX_DIGITS:
+        raise ValueError("Size {!r} is out of range".format(text.strip()))
+    numerator *= int(whole + frac) if whole + frac else 0
+    denominator *= 10 ** len(frac)
+    if exp10:
+        if exp10 > 0:
+            numerator *= 10 ** exp10
+        else:
+            denominator *= 10 ** -exp10
+    if sign == '-':
+        numerator = -numerator
+    return numerator, denominator
+
+
 class Quantity(int):
     """Represents a quantity of bytes, suitable for formatting.
 
-    :param value: a non-negative, integral number of bytes. If pint_ is
+    :param value: a non-negative, integral number of bytes. `value` may also
+                  be a `str` like ``'200 MiB'`` or ``'1.5 kilobytes'`` using
+                  the units in `UNITS_TABLE`, or ``bit``/``b``. If pint_ is
                   available, `value` may also be specified as a
-                  :class:`pint.Quantity` or a `str` to pass to
-                  :class:`pint.Quantity`'s constructor.
+                  :class:`pint.Quantity`, or a `str` with any other
+                  expression to pass to :class:`pint.Quantity`'s
+                  constructor.
     :type value: Integral or :class:`pint.Quantity` or str
     :raises TypeError: if `value` is not integral or is negative
-    :raises NeedPintForParsingError: if `value` is a `str` and
-                                     pint_ is not installed
+    :raises NeedPintForParsingError: if `value` is a `str` that needs pint_
+                                     to parse, and pint_ is not installed
+    :raises ValueError: if `value` is a `str` with a number of more than a
+                        few hundred digits, counting its exponent
+
+    Quantities hash like their values as ints, so they may be used as `dict`
+    keys. Quantities of common values are shared, e.g. ``Quantity(1024) is
+    Quantity('1 KiB')``.
     """
 
+    __slots__ = ()
+
     def __new__(cls, value):
         orig_value = value
 
-        if _ureg and is_string(value):
-            value = _ureg(value)
+        if is_string(value):
+            parsed = _parse_size(value)
+            if parsed is not None:
+                value, remainder = divmod(*parsed)
+                if remainder:
+                    raise TypeError("Value {} must be integral".format(orig_value))
+            elif _ureg:
+                value = _ureg(value)
         elif isinstance(value, float):
             if value.is_integer():
                 value = int(value)
@@ -82,53 +169,85 @@ class Quantity(int):
         elif isinstance(value, Quantity):
             value = int(value)
 
-        if _ureg and isinstance(value, pint.quantity._Quantity):
-            assert value.magnitude >= 0
-            bytes_f = value.to('byte').magnitude
-            assert isinstance(bytes_f, int) or bytes_f.is_integer()
-            value = int(bytes_f)
-        elif isinstance(value, int):
+        if isinstance(value, int):
             if value < 0:
                 raise TypeError("Value {} must be non-negative".format(orig_value))
         elif is_string(value):
             raise NeedPintForParsingError(value)
+        elif _ureg and isinstance(value, _import_pint().quantity._Quantity):
+            assert value.magnitude >= 0
+            bytes_f = value.to('byte').magnitude
+            assert isinstance(bytes_f, int) or bytes_f.is_integer()
+            value = int(bytes_f)
         else:
             raise TypeError("Cannot parse {} {!r} as Quantity".format(type(orig_value).__name__, orig_value))
 
+        if cls is Quantity:
+            interned = _interned.get(value)
+            if interned is not None:
+                return interned
         return super(Quantity, cls).__new__(cls, value)
 
     def __int__(self):
         return int.__int__(self)
 
+    # the results of arithmetic with ints skip the checks in `__new__`,
+    # except for the sign. anything else takes the long way round
     def __add__(self, other):
-        return Quantity(int(self) + other)
+        value = int.__add__(self, other)
+        if value is NotImplemented or value < 0:
+            return _long_way(int(self) + other)
+        return int.__new__(Quantity, value)
 
     def __radd__(self, other):
-        return Quantity(other + int(self))
+        value = int.__radd__(self, other)
+        if value is NotImplemented or value < 0:
+            return _long_way(other + int(self))
+        return int.__new__(Quantity, value)
 
     def __sub__(self, other):
-        return Quantity(int(self) - other)
+        value = int.__sub__(self, other)
+        if value is NotImplemented or value < 0:
+            return _long_way(int(self) - other)
+        return int.__new__(Quantity, value)
 
     def __rsub__(self, other):
-        return Quantity(other - int(self))
+        value = int.__rsub__(self, other)
+        if value is NotImplemented or value < 0:
+            return _long_way(other - int(self))
+        return int.__new__(Quantity, value)
 
     def __mul__(self, other):
-        return Quantity(int(self) * other)
+        value = int.__mul__(self, other)
+        if value is NotImplemented or value < 0:
+            return _long_way(int(self) * other)
+        return int.__new__(Quantity, value)
 
     def __rmul__(self, other):
-        return Quantity(other * int(self))
+        value = int.__rmul__(self, other)
+        if value is NotImplemented or value < 0:
+            return _long_way(other * int(self))
+        return int.__new__(Quantity, value)
 
     # regular division is not overloaded
 
     def __floordiv__(self, other):
-        return Quantity(int(self) // other)
+        value = int.__floordiv__(self, other)
+        if value is NotImplemented or value < 0:
+            return _long_way(int(self) // other)
+        return int.__new__(Quantity, value)
 
     def __rfloordiv__(self, other):
-        return Quantity(other // int(self))
+        value = int.__rfloordiv__(self, other)
+        if value is NotImplemented or value < 0:
+            return _long_way(other // int(self))
+        return int.__new__(Quantity, value)
 
     def __eq__(self, other):
         return int(self) == other
 
+    __hash__ = int.__hash__
+
     def __lt__(self, other):
         if type(other) != Quantity:
             raise TypeError("unorderable types: {}() < {}()".format(type(self).__name__, type(other).__name__))
@@ -156,72 +275,82 @@ class Quantity(int):
         return '<Quantity {}>'.format(int(self))
 
     def __format__(self, spec):
-        fill, align, string_width, precision, type_ = Quantity.parse_spec(spec)
-        base, short, long_opts = self.format_options(fill, align, string_width, precision, type_)
+        try:
+            plan = _format_plans[spec]
+        except KeyError:
+            plan = _format_plans.compile(spec)
+        if _results.maxsize and _results.active():
+            return _results.call(('format', spec, self), plan.format, self)
+        return plan.format(self)
+
+    def humanize(self, base=1024, cutoff=1000, digits=5, abbrev=True, cache=True):
+        assert base >= cutoff
+        assert digits >= 5
 
-        if short:
-            units_width = 1 if base == 1000 else 2
-            number, units = self.short_humanize(base=base, tolerance=0.01)
-        else:
-            cutoff, digits_width, units_width, abbrev = long_opts
-            number, units = self.humanize(base=base, cutoff=cutoff, digits=digits_width, abbrev=abbrev)
+        if cache and _results.maxsize and _results.active():
+            return _results.call(('humanize', base, cutoff, digits, abbrev, self),
+                                 self.humanize, base, cutoff, digits, abbrev, False)
+
+        qq, exp = _division(int(self), base=base, cutoff=cutoff)
+        return _humanized(qq, exp, base, digits, abbrev)
+
+    def decompose(self, base=1024, cutoff=1000, digits=5):
+        """The numbers behind :meth:`humanize`, without building any strings.
+
+        >>> Quantity(1400605).decompose()
+        Decomposition(whole=1, fraction=335, fraction_digits=3, exact=False, exp=2, base=1024)
+        >>> Quantity('1.5 KiB').decompose()
+        Decomposition(whole=1, fraction=5, fraction_digits=1, exact=True, exp=1, base=1024)
 
-        return Quantity.string_format(number, units, fill, align, string_width, units_width, short)
+        The arguments are as for :meth:`humanize`, and so is the rounding:
+        fractional digits beyond `digits` characters are dropped.
 
-    def humanize(self, base=1024, cutoff=1000, digits=5, abbrev=True):
+        :return: a :class:`Decomposition`
+        :raises UnitNoExistError: if the quantity is too large for any unit
+        """
         assert base >= cutoff
         assert digits >= 5
 
-        qq, exp = _Quotient.division(int(self), base=base, cutoff=cutoff)
-
-        def units():
-            plural = qq != 1
-            try:
-                prefix = UNITS_TABLE[base][exp][0 if abbrev else 1]
-                base_unit = 'B' if abbrev else ('bytes' if plural else 'byte')
-                return prefix + base_unit
-            except IndexError:
-                pass
+        qq, exp = _division(int(self), base=base, cutoff=cutoff)
+        if exp >= len(UNITS_TABLE[base]):
             raise UnitNoExistError()
+        return Decomposition._make(qq.decompose(digits) + (exp, base))
 
-        if qq.exact:
-            return str(qq.numerator), units()
-        else:
-            return qq.decimalize(digits), units()
+    def short_humanize(self, base=None, tolerance=0.01, cache=True):
+        if cache and _results.maxsize and _results.active():
+            return _results.call(('short_humanize', base, tolerance, self),
+                                 self.short_humanize, base, tolerance, False)
 
-    def short_humanize(self, base=None, tolerance=0.01):
         if base is None:
-            base = self.guess_base(tolerance=tolerance)
+            base, qq, exp = _auto_division(int(self), tolerance=tolerance)
             base_was_guessed = True
         else:
+            qq, exp = _division(int(self), base=base, cutoff=1000)
             base_was_guessed = False
 
-        qq, exp = _Quotient.division(int(self), base=base, cutoff=1000)
-
-        def units():
-            try:
-                return UNITS_TABLE[base][exp][0] or 'B'
-            except IndexError:
-                pass
-            raise UnitNoExistError()
-
-        if qq.exact or (base == 1000 and base_was_guessed):
-            return str(qq.whole_part), units()
-        elif qq < 100:
-            return qq.decimalize(4), units()
-        else:
-            return str(qq.whole_part), units()
+        return _short_humanized(qq, exp, base, round_down=base == 1000 and base_was_guessed)
 
     def guess_base(self, tolerance=0):
         # guess base 1000 vs. 1024. if 1000 is exact or slightly above exact
         # (like HDD capacities), round down and call it 'exact'. otherwise use
         # base 1024
 
-        qq, exp = _Quotient.division(int(self), base=1000, cutoff=1000)
-
-        return 1000 if qq.fractional_part <= tolerance else 1024
+        return _guess_base(int(self), tolerance)
 
     def format_options(self, fill, align, string_width, precision, type_):
+        base, short, abbrev = Quantity.parse_type(type_)
+
+        if short:
+            return base, short, None
+
+        else:
+            if base is None:
+                base = self.guess_base()
+
+            return base, short, Quantity.long_options(base, precision, abbrev)
+
+    @staticmethod
+    def parse_type(type_):
         type_pref = None
         abbrev = True
         short = False
@@ -253,26 +382,23 @@ class Quantity(int):
         elif type_pref == 'a':
             base = None
 
-        if short:
-            return base, short, None
+        return base, short, abbrev
 
-        else:
-            if base is None:
-                base = self.guess_base()
-
-            binary = base == 1024
+    @staticmethod
+    def long_options(base, precision, abbrev):
+        binary = base == 1024
 
-            # "precision" from spec is the width of the number itself (including the dot)
-            digits_width = precision if precision is not None and precision > 5 else 5
+        # "precision" from spec is the width of the number itself (including the dot)
+        digits_width = precision if precision is not None and precision > 5 else 5
 
-            if abbrev:
-                units_width = len('YiB') if binary else len('YB')
-            else:
-                units_width = len('yobibytes') if binary else len('yottabytes')
+        if abbrev:
+            units_width = len('YiB') if binary else len('YB')
+        else:
+            units_width = len('yobibytes') if binary else len('yottabytes')
 
-            cutoff = 1024 if binary and digits_width > 5 else 1000
+        cutoff = 1024 if binary and digits_width > 5 else 1000
 
-            return base, short, (cutoff, digits_width, units_width, abbrev)
+        return cutoff, digits_width, units_width, abbrev
 
     @staticmethod
     def string_format(number, units, fill=None, align=None, string_width=None, units_width=None, short=None):
@@ -443,7 +569,334 @@ class Quantity(int):
                 type_)
 
 
-def formatter(base=1024, cutoff=1000, digits=5, abbrev=True):
+_PLAIN_INTS = frozenset([type(0), type(2**64)])  # also `long` on Python 2
+
+# shared instances of small ints and the powers of 2 and 10 that units are
+# made of, so common constants don't allocate
+_interned = dict((value, int.__new__(Quantity, value))
+                 for value in set(range(257)) |
+                 set(2**exp for exp in range(91)) |
+                 set(10**exp for exp in range(28)))
+
+
+def _long_way(value):
+    """The result of arithmetic with a `Quantity` and something other than
+    an int, which may be e.g. a `QuantityArray` from the other operand
+    """
+    if isinstance(value, QuantityArray):
+        return value
+    return Quantity(value)
+
+
+class _FormatPlan(object):
+    """A format spec for :meth:`Quantity.__format__`, parsed and validated
+    once. Only the choice between decimal and binary units in automatic mode
+    is left to be made for each value.
+
+    The units, with the space before them and the padding after them, are
+    built once for each unit and kept in `suffixes`. The string `width`,
+    `fill` character and `alignment` (``'<'``, ``'>'`` or ``'^'``) are kept
+    for callers that pad strings themselves.
+    """
+
+    __slots__ = ('short', 'base', 'long_opts', 'units_width', 'pad', 'width', 'fill',
+                 'alignment', 'align', 'suffixes')
+
+    def __init__(self, spec):
+        fill, align, string_width, precision, type_ = Quantity.parse_spec(spec)
+        self.base, self.short, abbrev = Quantity.parse_type(type_)
+
+        if self.short:
+            self.long_opts = None
+            self.units_width = 1 if self.base == 1000 else 2
+        else:
+            self.long_opts = {base: Quantity.long_options(base, precision, abbrev)
+                              for base in (1000, 1024)}
+            self.units_width = None
+
+        # equivalent to `Quantity.string_format`, with the spec built up front
+        if string_width is not None and align is None:
+            align = '='
+        self.pad = (fill if fill is not None else ' ') if align == '=' else None
+
+        if align is None:
+            assert fill is None
+            fa_spec = ''
+        elif align == '=':
+            fa_spec = (fill if fill is not None else '') + '>'
+        else:
+            fa_spec = (fill if fill is not None else '') + align
+
+        # `str.ljust` and `str.rjust` pad as `str.format` does, but
+        # `str.center` puts an odd fill character on the other side
+        fill_char = fill if fill is not None else ' '
+        self.width, self.fill = string_width, fill_char
+        self.alignment = fa_spec[-1] if string_width is not None else None
+        if string_width is None:
+            self.align = None
+        elif fa_spec.endswith('<'):
+            self.align = lambda string: string.ljust(string_width, fill_char)
+        elif fa_spec.endswith('>'):
+            self.align = lambda string: string.rjust(string_width, fill_char)
+        else:
+            self.align = lambda string: _center(string, string_width, fill_char)
+        self.suffixes = {}
+
+    def format(self, value):
+        """Format `value`, a :class:`Quantity` or a plain int"""
+        base, number, units = self.humanize(value)
+        try:
+            suffix = self.suffixes[base, units]
+        except KeyError:
+            suffix = self.suffixes[base, units] = self._suffix(base, units)
+        if self.align is None:
+            return number + suffix
+        return self.align(number + suffix)
+
+    def humanize(self, value):
+        """The ``(base, number, units)`` of `value`, a :class:`Quantity` or
+        a plain int, before any padding
+        """
+        value = int.__int__(value)
+        if self.short:
+            if self.base is None:
+                base, qq, exp = _auto_division(value, tolerance=0.01)
+                number, units = _short_humanized(qq, exp, base, round_down=base == 1000)
+            else:
+                base = self.base
+                qq, exp = _division(value, base=base, cutoff=1000)
+                number, units = _short_humanized(qq, exp, base)
+        else:
+            if self.base is None:
+                base, qq, exp = _auto_division(value, cutoff=self.long_opts[1024][0])
+            else:
+                base = self.base
+                qq, exp = _division(value, base=base, cutoff=self.long_opts[base][0])
+            cutoff, digits_width, units_width, abbrev = self.long_opts[base]
+            number, units = _humanized(qq, exp, base, digits_width, abbrev)
+        return base, number, units
+
+    def _suffix(self, base, units):
+        """The string after the number for `units`"""
+        if self.short:
+            units_width = self.units_width
+            suffix = units
+        else:
+            units_width = self.long_opts[base][2]
+            suffix = ' ' + units
+        if self.pad is not None:
+            suffix += self.pad * (units_width - len(units))
+        return suffix
+
+
+def _center(string, width, fill):
+    """Center `string` in `width` characters as ``str.format`` does, with any
+    odd `fill` character on the right
+    """
+    pad = width - len(string)
+    if pad <= 0:
+        return string
+    return fill * (pad // 2) + string + fill * (pad - pad // 2)
+
+
+class _FormatPlanCache(object):
+    """Bounded cache of `_FormatPlan` objects, keyed by format spec.
+
+    When full, the oldest plan is evicted. Lookups that miss should call
+    `compile`, which counts the miss and caches the new plan.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.plans = {}
+        self.order = []
+        self.hits = 0
+        self.misses = 0
+
+    def __getitem__(self, spec):
+        with self.lock:
+            plan = self.plans[spec]
+            self.hits += 1
+        return plan
+
+    def compile(self, spec):
+        plan = _FormatPlan(spec)
+        with self.lock:
+            self.misses += 1
+            if spec not in self.plans:
+                if len(self.order) >= self.maxsize:
+                    del self.plans[self.order.pop(0)]
+                self.order.append(spec)
+            self.plans[spec] = plan
+        return plan
+
+    def info(self):
+        with self.lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self.plans))
+
+    def clear(self):
+        with self.lock:
+            self.plans.clear()
+            del self.order[:]
+            self.hits = self.misses = 0
+
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+_format_plans = _FormatPlanCache()
+
+
+def spec_cache_info():
+    """Report statistics for the cache of parsed format specs.
+
+    :meth:`Quantity.__format__` parses and validates each distinct format
+    spec once, then reuses the result.
+
+    :return: a :class:`CacheInfo` ``(hits, misses, maxsize, currsize)``
+    """
+    return _format_plans.info()
+
+
+def spec_cache_clear():
+    """Empty the cache of parsed format specs and reset its statistics."""
+    _format_plans.clear()
+
+
+class _ResultCache(object):
+    """Bounded cache of formatted strings, keyed by what was formatted and
+    how. When full, the least recently used string is evicted. The cache is
+    off while `maxsize` is 0.
+    """
+
+    def __init__(self):
+        self.maxsize = 0
+        self.lock = threading.Lock()
+        self.results = OrderedDict()
+        self.local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def active(self):
+        """Whether the cache may be used in this thread"""
+        return not getattr(self.local, 'disabled', False)
+
+    def call(self, key, function, *args):
+        """The cached result for `key`, otherwise ``function(*args)``"""
+        with self.lock:
+            try:
+                result = self.results[key]
+            except KeyError:
+                self.misses += 1
+            else:
+                _move_to_end(self.results, key)
+                self.hits += 1
+                return result
+
+        result = function(*args)
+        with self.lock:
+            self.results[key] = result
+            self.evict()
+        return result
+
+    def wrap(self, key, function):
+        """Cache `function`'s results for ints and quantities. `key`
+        identifies `function` among everything else in the cache.
+        """
+        def cached(value):
+            if self.maxsize and value.__class__ in _CACHEABLE and self.active():
+                return self.call((key, value), function, value)
+            return function(value)
+        return cached
+
+    def evict(self):
+        while len(self.results) > self.maxsize:
+            self.results.popitem(last=False)
+            self.evictions += 1
+
+    def resize(self, maxsize):
+        with self.lock:
+            self.maxsize = maxsize
+            self.evict()
+
+    def info(self):
+        with self.lock:
+            return ResultCacheInfo(self.hits, self.misses, self.evictions, self.maxsize,
+                                   len(self.results))
+
+    def clear(self):
+        with self.lock:
+            self.results.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+if hasattr(OrderedDict, 'move_to_end'):
+    _move_to_end = OrderedDict.move_to_end
+else:  # Python 2
+    def _move_to_end(ordered, key):
+        ordered[key] = ordered.pop(key)
+
+ResultCacheInfo = namedtuple('ResultCacheInfo', ['hits', 'misses', 'evictions', 'maxsize', 'currsize'])
+
+_results = _ResultCache()
+_CACHEABLE = _PLAIN_INTS | frozenset([Quantity])
+
+
+def enable_result_cache(maxsize=4096):
+    """Cache formatted strings, up to `maxsize` of them.
+
+    While the cache is enabled, :meth:`Quantity.__format__`,
+    :meth:`Quantity.humanize`, :meth:`Quantity.short_humanize` and the
+    functions returned by :func:`formatter` and :func:`short_formatter`
+    return the cached result when they format the same value the same way
+    again. The least recently used result is evicted when the cache is full.
+    The cache is safe to use from multiple threads.
+
+    To bypass the cache for particular calls, pass ``cache=False`` to the
+    functions above, or use :func:`result_cache_disabled`.
+
+    :param maxsize: the number of strings to keep
+    """
+    if not maxsize > 0:
+        raise ValueError("maxsize must be positive")
+    _results.resize(maxsize)
+
+
+def disable_result_cache():
+    """Stop caching formatted strings, and empty the cache"""
+    _results.resize(0)
+
+
+@contextmanager
+def result_cache_disabled():
+    """Bypass the result cache in this thread within a ``with`` block, e.g.
+    for the call sites of :meth:`Quantity.__format__`, which can't pass
+    ``cache=False``.
+    """
+    was_disabled = not _results.active()
+    _results.local.disabled = True
+    try:
+        yield
+    finally:
+        _results.local.disabled = was_disabled
+
+
+def result_cache_info():
+    """Report statistics for the result cache.
+
+    :return: a :class:`ResultCacheInfo` ``(hits, misses, evictions, maxsize,
+             currsize)``
+    """
+    return _results.info()
+
+
+def result_cache_clear():
+    """Empty the result cache and reset its statistics."""
+    _results.clear()
+
+
+def formatter(base=1024, cutoff=1000, digits=5, abbrev=True, cache=True):
     """Return a function that formats quantities of bytes.
 
     xxx principles
@@ -457,6 +910,8 @@ def formatter(base=1024, cutoff=1000, digits=5, abbrev=True):
     :param base: 1000 to use decimal SI units, or 1024 to use binary IEC units
     :param cutoff: the highest allowable formatted number. Must be either
                    1000 or 1024, and less than or equal to `base`
+    :param cache: if false, never use the result cache (see
+                  :func:`enable_result_cache`)
     :return: a function from values to strings
 
     """
@@ -471,15 +926,45 @@ def formatter(base=1024, cutoff=1000, digits=5, abbrev=True):
     if abbrev not in (True, False):
         raise ValueError("abbrev must be boolean")
 
+    # memoized by the validated arguments, e.g. so that `base=1000.0` is
+    # never mistaken for `base=1000`
+    base, cutoff, digits = int(base), int(cutoff), int(digits)
+    abbrev, cache = bool(abbrev), bool(cache)
+    key = (base, cutoff, digits, abbrev, cache)
+    try:
+        return _formatters[key]
+    except KeyError:
+        pass
+
+    # ' ' + units for each exponent, for quantities of exactly one unit and
+    # for everything else
+    if abbrev:
+        singular = plural = [' ' + prefix + 'B' for prefix, _ in UNITS_TABLE[base]]
+    else:
+        singular = [' ' + prefix + 'byte' for _, prefix in UNITS_TABLE[base]]
+        plural = [' ' + prefix + 'bytes' for _, prefix in UNITS_TABLE[base]]
+    num_units = len(plural)
+
     def inner(value):
-        number, units = Quantity(value).humanize(
-            base=base, cutoff=cutoff, digits=digits, abbrev=abbrev)
-        result = Quantity.string_format(number, units)
-        return result
+        if value.__class__ not in _PLAIN_INTS or value < 0:
+            value = int(Quantity(value))
+        qq, exp = _division(value, base, cutoff)
+        if exp >= num_units:
+            raise UnitNoExistError()
+        if not qq.exact:
+            return _number(*qq.decompose(digits)) + plural[exp]
+        elif qq.whole_part == 1:
+            return '1' + singular[exp]
+        else:
+            return str(qq.whole_part) + plural[exp]
+
+    if cache:
+        inner = _results.wrap(('formatter',) + key, inner)
+    _memoize(_formatters, key, inner)
     return inner
 
 
-def short_formatter(tolerance=None, base=None):
+def short_formatter(tolerance=None, base=None, cache=True):
     """Return a function that formats quantities of bytes.
 
     xxx principles, drag text out of param text
@@ -500,6 +985,8 @@ def short_formatter(tolerance=None, base=None):
                             exact. If specified must be between 0 and 1, and
                             defaults to 0.01.
     :param base int: If 1024, use binary units. If 1000, use decimal units.
+    :param cache: if false, never use the result cache (see
+                  :func:`enable_result_cache`)
 
     :return: a function from values to strings
 
@@ -513,13 +1000,53 @@ def short_formatter(tolerance=None, base=None):
 
     if tolerance is None:
         tolerance = 0.01
+    # memoized by the validated arguments, as in `formatter`
+    base, cache = base if base is None else int(base), bool(cache)
+    key = (tolerance, base, cache)
+    try:
+        return _short_formatters[key]
+    except KeyError:
+        pass
+
+    units = {base_: [prefix or 'B' for prefix, _ in subtable]
+             for base_, subtable in UNITS_TABLE.items()}
 
     def inner(value):
-        number, units = Quantity(value).short_humanize(base=base, tolerance=tolerance)
-        return str(number) + units
+        if value.__class__ not in _PLAIN_INTS or value < 0:
+            value = int(Quantity(value))
+
+        if base is None:
+            base_, qq, exp = _auto_division(value, tolerance=tolerance)
+        else:
+            base_ = base
+            qq, exp = _division(value, base_, 1000)
+
+        try:
+            unit = units[base_][exp]
+        except IndexError:
+            raise UnitNoExistError()
+        if qq.exact or qq.whole_part >= 100 or (base is None and base_ == 1000):
+            # round down when decimal units were guessed
+            return str(qq.whole_part) + unit
+        else:
+            return _number(*qq.decompose(4)) + unit
+
+    if cache:
+        inner = _results.wrap(('short_formatter',) + key, inner)
+    _memoize(_short_formatters, key, inner)
     return inner
 
 
+_formatters = {}
+_short_formatters = {}
+
+
+def _memoize(cache, key, function, maxsize=128):
+    if len(cache) >= maxsize:
+        cache.clear()
+    cache[key] = function
+
+
 class _Quotient(Fraction):
     @staticmethod
     def division(value, base=1024, cutoff=1000):
@@ -548,6 +1075,13 @@ class _Quotient(Fraction):
     def fractional_part(self):
         return self - self // 1
 
+    def fractional_at_most(self, tolerance):
+        return self.fractional_part <= tolerance
+
+    def decompose(self, digits):
+        fractional = self.fractional_part
+        return _decompose(self.whole_part, fractional.numerator, fractional.denominator, digits)
+
     def decimalize(self, length):
         D = decimal.Decimal
         with decimal.localcontext() as ctx:
@@ -557,13 +1091,346 @@ class _Quotient(Fraction):
             return str(n)[0:length]
 
 
-_ureg = None
+class _IntQuotient(object):
+    """The quotient ``whole + rem / den``, computed with `int` arithmetic only.
+
+    This is a drop-in replacement for `_Quotient` that avoids building
+    :class:`fractions.Fraction` and :class:`decimal.Decimal` values.
+    `decompose` gives exactly the same results as `_Quotient.decompose`.
+    """
+
+    __slots__ = ('whole', 'rem', 'den')
+
+    def __init__(self, whole, rem, den):
+        self.whole = whole
+        self.rem = rem
+        self.den = den
+
+    @staticmethod
+    def division(value, base=1024, cutoff=1000):
+        assert base in (1000, 1024)
+        assert cutoff in (1000, 1024)
+
+        exp = _IntQuotient.exponent(value, base, cutoff)
+        den = _POWERS[base][exp]
+        if base == 1024:
+            return _IntQuotient(value >> (10 * exp), value & (den - 1), den), exp
+        else:
+            whole, rem = divmod(value, den)
+            return _IntQuotient(whole, rem, den), exp
+
+    @staticmethod
+    def auto_division(value, tolerance=0, cutoff=1000):
+        """Like `_auto_division`, but only builds the quotient for the base
+        that wins.
+        """
+        try:
+            exp = _IntQuotient.exponent(value, 1000, 1000)
+        except UnitNoExistError:
+            if _guess_base(value, tolerance) == 1000:
+                raise
+        else:
+            den = _POWERS[1000][exp]
+            whole, rem = divmod(value, den)
+            num, tolerance_den = _ratio(tolerance)
+            if rem * tolerance_den <= num * den:
+                return 1000, _IntQuotient(whole, rem, den), exp
+
+        qq, exp = _IntQuotient.division(value, 1024, cutoff)
+        return 1024, qq, exp
+
+    @staticmethod
+    def exponent(value, base, cutoff):
+        table = _EXPONENT_TABLES[base, cutoff]
+        bits = value.bit_length()
+        if bits >= len(table):
+            raise UnitNoExistError()
+        exp, threshold = table[bits]
+        if value >= threshold:
+            exp += 1
+        if exp == len(UNITS_TABLE[base]):
+            raise UnitNoExistError()
+        return exp
+
+    @property
+    def exact(self):
+        return self.rem == 0
+
+    @property
+    def whole_part(self):
+        return self.whole
+
+    def fractional_at_most(self, tolerance):
+        num, den = _ratio(tolerance)
+        return self.rem * den <= num * self.den
+
+    def decompose(self, digits):
+        return _decompose(self.whole, self.rem, self.den, digits)
+
+
+def _decompose(whole, rem, den, digits):
+    """The quotient ``whole + rem / den`` as the first `digits` characters of
+    `_Quotient.decimalize` show it.
+
+    The smallest quotient with no whole part is 1000 / 1024, so there are
+    never leading zeros to skip, unlike in `_Quotient.decimalize` in general.
+    `digits` must leave room for the whole part and the dot.
+
+    :return: ``(whole, fraction, fraction_digits, exact)``, where `exact` is
+             whether the digits shown are the whole expansion
+    """
+    if not rem:
+        return whole, 0, 0, True
+    shown = digits - len(str(whole)) - 1
+    if shown <= 0:
+        return whole, 0, 0, False
+    fraction, leftover = divmod(rem * 10**shown, den)
+    if leftover:
+        return whole, fraction, shown, False
+    # a terminating expansion is shown without trailing zeros
+    while not fraction % 10:
+        fraction //= 10
+        shown -= 1
+    return whole, fraction, shown, True
+
+
+def _number(whole, fraction, fraction_digits, exact):
+    """The number string for the result of `_decompose`, e.g. ``'1.335'``,
+    ``'1.5'``, ``'1023.'`` or ``'2'``
+    """
+    if fraction_digits:
+        return str(whole) + '.' + str(fraction).rjust(fraction_digits, '0')
+    return str(whole) if exact else str(whole) + '.'
+
+
+def _thresholds(base, cutoff):
+    """The smallest value taking each exponent after 0 in `_Quotient.division`.
+
+    A value takes exponent ``exp`` where ``exp`` is the number of thresholds
+    less than or equal to it. The last threshold is the first value with no
+    unit.
+    """
+    thresholds = []
+    for exp in range(len(UNITS_TABLE[base])):
+        threshold = cutoff * base**exp
+        if exp > 0 and base > cutoff:
+            threshold += 1  # e.g. '1000 KiB' rather than '0.976 MiB'
+        thresholds.append(threshold)
+    return thresholds
+
+
+def _exponent_table(base, cutoff):
+    """Precompute the exponents chosen by `_Quotient.division`.
+
+    Returns a list indexed by ``value.bit_length()``. Each entry is a pair
+    ``(exp, threshold)``: `value` takes exponent ``exp``, or ``exp + 1`` if
+    ``value >= threshold``. Thresholds are at least 1000 times apart, so each
+    range of values with the same bit length contains at most one of them.
+    """
+    thresholds = _thresholds(base, cutoff)
+
+    table = []
+    exp = 0
+    for bits in range(thresholds[-1].bit_length() + 1):
+        lo, hi = (1 << bits >> 1), (1 << bits)
+        while exp < len(thresholds) and thresholds[exp] <= lo:
+            exp += 1
+        if exp < len(thresholds) and thresholds[exp] < hi:
+            table.append((exp, thresholds[exp]))
+        else:
+            table.append((exp, hi))
+    return table
+
+
+_EXPONENT_TABLES = {
+    (base, cutoff): _exponent_table(base, cutoff)
+    for base, cutoff in ((1024, 1000), (1024, 1024), (1000, 1000))
+}
+
+_POWERS = {
+    base: [base**exp for exp in range(len(subtable))]
+    for base, subtable in UNITS_TABLE.items()
+}
+
+_division = _IntQuotient.division
+"""The division routine behind :meth:`Quantity.humanize` and friends.
+
+Set this to `_Quotient.division` to use the original
+:class:`fractions.Fraction` arithmetic as a reference implementation.
+"""
+
+
+def _guess_base(value, tolerance):
+    try:
+        qq, exp = _division(value, base=1000, cutoff=1000)
+    except UnitNoExistError:
+        # too big for decimal units, but binary units may still exist
+        den = 1000 ** ((len(str(value)) - 1) // 3)
+        qq = _IntQuotient(value // den, value % den, den)
+
+    return 1000 if qq.fractional_at_most(tolerance) else 1024
+
+
+def _auto_division(value, tolerance=0, cutoff=1000):
+    """Divide `value` by the base `_guess_base` would choose.
+
+    :param cutoff: the cutoff to use if binary units win
+    :return: ``(base, qq, exp)``
+    """
+    if _division is _IntQuotient.division:
+        return _IntQuotient.auto_division(value, tolerance, cutoff)
+
+    base = _guess_base(value, tolerance)
+    qq, exp = _division(value, base=base, cutoff=1000 if base == 1000 else cutoff)
+    return base, qq, exp
+
+
+def _ratio(number):
+    """`number` as an exact ``(numerator, denominator)`` pair"""
+    if isinstance(number, float):
+        return number.as_integer_ratio()
+    elif isinstance(number, int):
+        return number, 1
+    else:
+        number = Fraction(number)
+        return number.numerator, number.denominator
+
+
+def _humanized(qq, exp, base, digits, abbrev):
+    """The ``(number, units)`` strings of :meth:`Quantity.humanize` for the
+    result of a division
+    """
+    plural = not (qq.exact and qq.whole_part == 1)
+    try:
+        prefix = UNITS_TABLE[base][exp][0 if abbrev else 1]
+    except IndexError:
+        raise UnitNoExistError()
+    units = prefix + ('B' if abbrev else ('bytes' if plural else 'byte'))
+
+    if qq.exact:
+        return str(qq.whole_part), units
+    else:
+        return _number(*qq.decompose(digits)), units
+
+
+def _short_humanized(qq, exp, base, round_down=False):
+    """The ``(number, units)`` strings of :meth:`Quantity.short_humanize` for
+    the result of a division
+    """
+    try:
+        units = UNITS_TABLE[base][exp][0] or 'B'
+    except IndexError:
+        raise UnitNoExistError()
+
+    if qq.exact or round_down:
+        return str(qq.whole_part), units
+    elif qq.whole_part < 100:
+        return _number(*qq.decompose(4)), units
+    else:
+        return str(qq.whole_part), units
+
+
+class Decomposition(namedtuple('Decomposition', 'whole fraction fraction_digits exact exp base')):
+    """The result of :meth:`Quantity.decompose`: a quantity of bytes as a
+    number of units, ``whole.fraction`` times ``base ** exp``.
+
+    :ivar whole: the whole number of units, an int
+    :ivar fraction: the fractional digits shown, as an int, e.g. 5 for
+                    ``.05`` or ``.5``
+    :ivar fraction_digits: the number of fractional digits shown, e.g. 2
+                           for ``.05``
+    :ivar exact: whether the digits shown are exactly the quantity, rather
+                 than truncated
+    :ivar exp: the power of `base`, which is also the index of the units in
+               ``UNITS_TABLE[base]``
+    :ivar base: 1000 or 1024
+    """
+
+    __slots__ = ()
+
+    @property
+    def number(self):
+        """The number as :meth:`Quantity.humanize` shows it, e.g. ``'1.335'``"""
+        return _number(self.whole, self.fraction, self.fraction_digits, self.exact)
+
+    @property
+    def units(self):
+        """The abbreviated units, e.g. ``'MiB'``"""
+        return UNITS_TABLE[self.base][self.exp][0] + 'B'
+
+
+class _LazyRegistry(object):
+    """Stand-in for a pint_ unit registry that imports pint_ and builds the
+    registry the first time it's used. It's false if pint_ isn't installed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._registry = None
+        self._available = None
+
+    def _get(self):
+        if self._registry is None:
+            with self._lock:
+                if self._registry is None:
+                    registry = _import_pint().UnitRegistry('/dev/null')
+                    _add_pint_definitions(registry)
+                    self._registry = registry
+        return self._registry
+
+    def __bool__(self):
+        if self._available is None:
+            self._available = _find_module('pint') is not None
+        return self._available
+
+    __nonzero__ = __bool__
+
+    def __call__(self, *args, **kwargs):
+        return self._get()(*args, **kwargs)
+
+    def __getattr__(self, name):
+        # private names and dunders, e.g. as `copy` and `doctest` look them
+        # up, are this object's own, and without pint there's nothing to find
+        if name.startswith('_') or not self:
+            raise AttributeError(name)
+        return getattr(self._get(), name)
+
+
+def _import_pint():
+    """Import pint_, and replace any `_LazyModule` standing in for
+    `bytesize.pint` with it
+    """
+    global pint
+    import pint
+    return pint
+
+
+class _LazyModule(object):
+    """Stand-in for `bytesize.pint` before Python 3.7, where modules can't
+    define `__getattr__`. It imports pint_ the first time it's used.
+    """
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(_import_pint(), name)
+
+
+def __getattr__(name):
+    # `bytesize.pint`, before anything has needed to import it, on Python 3.7+
+    if name == 'pint' and _ureg:
+        return _import_pint()
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+_ureg = _LazyRegistry()
 """This module's unique unit registry.
 
 When pint_ is available, `bytesize` defines a unit registry containing only
 the units ``bit = b`` and ``byte = B``. It can parse human-readable `str`s
 into :class:`pint.Quantity` values. See the pint_ documentation for more
-information.
+information. pint_ is imported and the registry is built the first time
+`_ureg` is used.
 
 For your convenience, :class:`bytesize.Quantity` will use `_ureg` implicitly
 to parse `str` values when pint_ is installed, so you probably don't need to
@@ -576,6 +1443,11 @@ use this directly.
 >>> '{:ld}'.format(Quantity('500000 bytes'))
 '500 kilobytes'
 """
+
+if sys.version_info < (3, 7) and _ureg:
+    pint = _LazyModule()
+
+
 def _add_pint_definitions(ureg):
     ureg.define("bit = [data] = b")
     ureg.define("byte = 8 bit = B")
@@ -585,9 +1457,7 @@ def _add_pint_definitions(ureg):
                 ureg.define('{}- = {}**{} = {}-'.format(prefix, base, exp, abbrev))
 
 
-try:
-    import pint
-    _ureg = pint.UnitRegistry('/dev/null')
-    _add_pint_definitions(_ureg)
-except ImportError:
-    pass
+from .bulk import format_array, short_format_array, buffer_array, write_humanized, format_column
+from .aggregate import total, count, minimum, maximum, mean, summarize, Summary
+from .usage import disk_usage, walk_usage
+from .arrays import QuantityArray
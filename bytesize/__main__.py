@@ -0,0 +1,5 @@
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+
+from .cli import main_exit
+
+main_exit()
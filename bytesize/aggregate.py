@@ -0,0 +1,175 @@
+"""Reduce many quantities of bytes to a few.
+
+The reducers here accept any iterable of values accepted by
+:class:`Quantity`, including generators, and consume it only once. They add
+up plain ints and build a :class:`Quantity` only for the result, so they are
+much faster than e.g. ``sum(Quantity(x) for x in values)``.
+"""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from builtins import *
+
+import sys
+from collections import namedtuple
+from itertools import islice
+
+from . import Quantity
+
+_CHUNK_SIZE = 4096
+_as_int = int.__int__  # a plain int from an int or a Quantity
+
+
+def total(values):
+    """The sum of `values`.
+
+    >>> total([1024, Quantity('1 KiB'), 512])
+    <Quantity 2560>
+
+    :param values: an iterable of values accepted by :class:`Quantity`, or
+                   a NumPy integer array
+    :return: a :class:`Quantity`
+    :raises TypeError: if any of `values` is negative or not integral
+    """
+    result = 0
+    for chunk in _int_chunks(values):
+        result += sum(chunk)
+    return Quantity(result)
+
+
+def count(values):
+    """The number of `values`, like ``len(values)`` for any iterable.
+
+    :raises TypeError: as :func:`total` does
+    """
+    return summarize(values).count
+
+
+def minimum(values):
+    """The smallest of `values` as a :class:`Quantity`, or `None` if there
+    are none.
+
+    :raises TypeError: as :func:`total` does
+    """
+    return summarize(values).min
+
+
+def maximum(values):
+    """The largest of `values` as a :class:`Quantity`, or `None` if there are
+    none.
+
+    :raises TypeError: as :func:`total` does
+    """
+    return summarize(values).max
+
+
+def mean(values):
+    """The mean of `values` rounded down to a whole byte, as a
+    :class:`Quantity`, or `None` if there are none.
+
+    :raises TypeError: as :func:`total` does
+    """
+    return summarize(values).mean
+
+
+def summarize(values):
+    """The count, total, minimum and maximum of `values`, all at once.
+
+    >>> summarize([1024, 4096, 2048])
+    Summary(count=3, total=<Quantity 7168>, min=<Quantity 1024>, max=<Quantity 4096>)
+
+    :param values: an iterable of values accepted by :class:`Quantity`, or
+                   a NumPy integer array
+    :return: a :class:`Summary`
+    :raises TypeError: as :func:`total` does
+    """
+    count_ = total_ = 0
+    low = high = None
+    for chunk in _int_chunks(values):
+        count_ += len(chunk)
+        total_ += sum(chunk)
+        chunk_low, chunk_high = min(chunk), max(chunk)
+        if low is None or chunk_low < low:
+            low = chunk_low
+        if high is None or chunk_high > high:
+            high = chunk_high
+    return Summary._make_ints(count_, total_, low, high)
+
+
+class Summary(namedtuple('Summary', 'count total min max')):
+    """The result of :func:`summarize`.
+
+    Summaries of parts of a collection can be merged into a summary of the
+    whole, e.g. when each part is summarized by a different process:
+
+    >>> summarize([1024, 4096]).merge(summarize([2048]))
+    Summary(count=3, total=<Quantity 7168>, min=<Quantity 1024>, max=<Quantity 4096>)
+
+    :ivar count: the number of values
+    :ivar total: the sum of the values, as a :class:`Quantity`
+    :ivar min: the smallest value as a :class:`Quantity`, or `None` if there
+               are no values
+    :ivar max: the largest value as a :class:`Quantity`, or `None` if there
+               are no values
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def _make_ints(cls, count_, total_, low, high):
+        return cls(count_, Quantity(total_),
+                   None if low is None else Quantity(low),
+                   None if high is None else Quantity(high))
+
+    @property
+    def mean(self):
+        """The mean of the values rounded down to a whole byte, as a
+        :class:`Quantity`, or `None` if there are no values.
+        """
+        if not self.count:
+            return None
+        return self.total // self.count
+
+    def merge(self, *others):
+        """Combine this summary with `others`.
+
+        :param others: other instances of :class:`Summary`
+        :return: a :class:`Summary` of all the values summarized by this and
+                 `others`
+        """
+        summaries = (self,) + others
+        lows = [summary.min for summary in summaries if summary.count]
+        highs = [summary.max for summary in summaries if summary.count]
+        return Summary(sum(summary.count for summary in summaries),
+                       total(summary.total for summary in summaries),
+                       min(lows) if lows else None,
+                       max(highs) if highs else None)
+
+
+def _int_chunks(values, size=_CHUNK_SIZE):
+    """Split `values` into non-empty lists of at most `size` non-negative
+    plain ints, taking them from NumPy integer arrays in bulk
+    """
+    # a NumPy array can only have been made if NumPy was imported already
+    np = sys.modules.get('numpy')
+    if np is not None and isinstance(values, np.ndarray) and values.dtype.kind in 'iu':
+        values = values.reshape(-1)
+        if values.dtype.kind == 'i' and values.size and values.min() < 0:
+            raise TypeError("Value {} must be non-negative".format(values[values < 0][0]))
+        for start in range(0, len(values), size):
+            yield values[start:start + size].tolist()
+        return
+
+    iterator = iter(values)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        try:
+            ints = list(map(_as_int, chunk))
+        except TypeError:
+            # not all ints, so let `Quantity` convert or reject each one
+            ints = [_as_int(Quantity(value)) for value in chunk]
+        if min(ints) < 0:
+            negative = next(value for value in ints if value < 0)
+            raise TypeError("Value {} must be non-negative".format(negative))
+        yield ints
@@ -0,0 +1,231 @@
+"""A compact sequence of quantities of bytes.
+
+A :class:`Quantity` is a Python int, so a list of a million of them takes
+tens of megabytes. A :class:`QuantityArray` stores each value in 8 bytes, in
+a NumPy_ uint64 array when NumPy is installed and in an ``array('Q')``
+otherwise, and makes a :class:`Quantity` only for each value taken out of it.
+
+.. _NumPy: http://www.numpy.org/
+"""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from builtins import *
+
+import operator
+from array import array
+from functools import partial
+
+from . import Quantity, _format_plans
+from .aggregate import _int_chunks, total
+from .bulk import _numpy
+
+_UINT64_LIMIT = 2**64
+_quantity = partial(int.__new__, Quantity)  # skips the checks in `Quantity.__new__`
+
+
+class QuantityArray(object):
+    """A sequence of quantities of bytes, stored compactly.
+
+    >>> sizes = QuantityArray([1400605, 1024, 0])
+    >>> sizes[0]
+    <Quantity 1400605>
+    >>> sizes.format('.4s')
+    ['1.33Mi', '1Ki', '0B']
+
+    Values of 2**64 or more don't fit in 8 bytes. If there are any, every
+    value is kept as a Python int in a list instead, and everything still
+    works, just more slowly.
+
+    Indexing and iterating give :class:`Quantity` objects, and slicing gives
+    a new :class:`QuantityArray`. Adding, subtracting, multiplying and
+    floor-dividing by an int or a :class:`Quantity` apply to every value at
+    once, and raise `TypeError` if any result would be negative, as with
+    :class:`Quantity`.
+
+    :param values: an iterable of values accepted by :class:`Quantity`, or
+                   a NumPy integer array
+    :raises TypeError: if any of `values` is negative or not integral
+    """
+
+    __slots__ = ('_values',)
+
+    def __init__(self, values=()):
+        self._values = _store(values)
+
+    @classmethod
+    def _wrap(cls, values):
+        new = cls.__new__(cls)
+        new._values = values
+        return new
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._wrap(_copy(self._values[index]))
+        return _quantity(int(self._values[index]))
+
+    def __iter__(self):
+        return map(_quantity, self.tolist())
+
+    def __eq__(self, other):
+        if not isinstance(other, QuantityArray):
+            return NotImplemented
+        return self.tolist() == other.tolist()
+
+    def __ne__(self, other):
+        if not isinstance(other, QuantityArray):
+            return NotImplemented
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'QuantityArray({!r})'.format(self.tolist())
+
+    def tolist(self):
+        """The values as a list of plain ints"""
+        values = self._values
+        return list(values) if isinstance(values, list) else values.tolist()
+
+    def take(self, indices):
+        """The values at `indices`, e.g. from :meth:`argsort`, as a new
+        :class:`QuantityArray`
+        """
+        values = self._values
+        np = _numpy()
+        if np is not None and isinstance(values, np.ndarray):
+            return self._wrap(values[np.asarray(indices, dtype=np.intp)])
+        return self._wrap(_store_ints([values[index] for index in indices]))
+
+    def sum(self):
+        """The total of the values, as a :class:`Quantity`"""
+        values = self._values
+        np = _numpy()
+        if np is not None and isinstance(values, np.ndarray):
+            # add the high and low halves separately, so neither sum overflows
+            high = int((values >> np.uint64(32)).sum(dtype=np.uint64))
+            low = int((values & np.uint64(0xffffffff)).sum(dtype=np.uint64))
+            return Quantity((high << 32) + low)
+        return total(values)
+
+    def sort(self, reverse=False):
+        """Sort the values in place, smallest first unless `reverse`"""
+        values = self._values
+        np = _numpy()
+        if np is not None and isinstance(values, np.ndarray):
+            values.sort()
+            if reverse:
+                values[:] = values[::-1].copy()
+        elif isinstance(values, list):
+            values.sort(reverse=reverse)
+        else:
+            values[:] = array(values.typecode, sorted(values, reverse=reverse))
+
+    def argsort(self, reverse=False):
+        """The indices that would sort the values, smallest first unless
+        `reverse`. Equal values keep their order.
+
+        :return: a NumPy array of indices when NumPy is installed, and a list
+                 of them otherwise. Either can be passed to :meth:`take`.
+        """
+        values = self._values
+        np = _numpy()
+        if np is not None and isinstance(values, np.ndarray):
+            # in a uint64 array, ``~value`` is ``2**64 - 1 - value``
+            return np.argsort(~values if reverse else values, kind='stable')
+        return sorted(range(len(values)), key=values.__getitem__, reverse=reverse)
+
+    def format(self, spec=''):
+        """Format each value with `spec`, as :meth:`Quantity.__format__`
+        would.
+
+        :return: a list of strings
+        :raises ValueError: if `spec` is invalid
+        """
+        try:
+            plan = _format_plans[spec]
+        except KeyError:
+            plan = _format_plans.compile(spec)
+        fmt = plan.format
+        return [fmt(_quantity(value)) for value in self.tolist()]
+
+    def _arithmetic(self, other, op):
+        """Apply ``op(value, other)`` to every value"""
+        try:
+            scalar = operator.index(other)
+        except TypeError:
+            return NotImplemented
+        values = self._values
+        np = _numpy()
+        if np is not None and isinstance(values, np.ndarray) and len(values):
+            # each `op` is monotonic in `value`, so the results are all in
+            # range if those for the smallest and largest value are
+            ends = (op(int(values.min()), scalar), op(int(values.max()), scalar))
+            if 0 <= scalar < _UINT64_LIMIT and 0 <= min(ends) and max(ends) < _UINT64_LIMIT:
+                return self._wrap(op(values, np.uint64(scalar)))
+        return QuantityArray(op(value, scalar) for value in self.tolist())
+
+    def __add__(self, other):
+        return self._arithmetic(other, operator.add)
+
+    def __radd__(self, other):
+        return self._arithmetic(other, operator.add)
+
+    def __sub__(self, other):
+        return self._arithmetic(other, operator.sub)
+
+    def __rsub__(self, other):
+        return self._arithmetic(other, _reversed(operator.sub))
+
+    def __mul__(self, other):
+        return self._arithmetic(other, operator.mul)
+
+    def __rmul__(self, other):
+        return self._arithmetic(other, operator.mul)
+
+    # regular division is not overloaded, as for `Quantity`
+
+    def __floordiv__(self, other):
+        return self._arithmetic(other, operator.floordiv)
+
+    def __rfloordiv__(self, other):
+        return self._arithmetic(other, _reversed(operator.floordiv))
+
+
+def _reversed(op):
+    return lambda value, scalar: op(scalar, value)
+
+
+def _store(values):
+    """`values` in the most compact storage that holds them all"""
+    if isinstance(values, QuantityArray):
+        return _copy(values._values)
+    np = _numpy()
+    if np is not None and isinstance(values, np.ndarray) and values.dtype.kind in 'iu':
+        if values.dtype.kind == 'i' and values.size and values.min() < 0:
+            raise TypeError("Value {} must be non-negative".format(values[values < 0][0]))
+        return values.astype(np.uint64).reshape(-1)
+
+    ints = []
+    for chunk in _int_chunks(values):
+        ints.extend(chunk)
+    return _store_ints(ints)
+
+
+def _copy(values):
+    # a NumPy slice is a view, which e.g. `sort` would change
+    if isinstance(values, array):
+        return array(values.typecode, values)
+    return list(values) if isinstance(values, list) else values.copy()
+
+
+def _store_ints(ints):
+    """Store a list of non-negative plain ints"""
+    if ints and max(ints) >= _UINT64_LIMIT:
+        return ints
+    np = _numpy()
+    if np is not None:
+        return np.array(ints, dtype=np.uint64)
+    return array('Q', ints)
@@ -0,0 +1,677 @@
+"""Format many quantities of bytes at once.
+
+The functions here give exactly the same results as the corresponding
+functions in :mod:`bytesize` applied to each value in turn. They use NumPy_
+when it's installed, and fall back to formatting one value at a time
+otherwise.
+
+Values can also be read in place from any object supporting the buffer
+protocol, e.g. an mmap of a file of 64-bit counters, with
+:func:`buffer_array`, and formatted values can be written to a file as
+they're made rather than returned in a list.
+
+.. _NumPy: http://www.numpy.org/
+"""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from builtins import *
+
+import io
+import re
+import struct
+from itertools import islice
+
+from . import (UNITS_TABLE, Quantity, formatter, short_formatter, _thresholds, _IntQuotient,
+               _PLAIN_INTS, _center, _format_plans)
+from .aggregate import _int_chunks
+
+_UINT64_LIMIT = 2**64
+_OMIT = _UINT64_LIMIT - 1  # code for an omitted fractional part
+
+# `frac * 10 + digit` must fit in a uint64, so at most 19 fractional digits
+_MAX_DIGITS = 21
+
+_WRITE_CHUNK_SIZE = 1 << 16  # values formatted at a time for `out`
+
+_iter_unpack = getattr(struct, 'iter_unpack', None)  # not in Python 2
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def format_array(values, base=1024, cutoff=1000, digits=5, abbrev=True, out=None):
+    """Format each of `values` as :func:`formatter` would.
+
+    >>> format_array([1400605, 1024, 0])
+    ['1.335 MiB', '1 KiB', '0 B']
+
+    Values in a NumPy integer array are formatted without converting each
+    one to a Python object. Values beyond the range of a 64-bit unsigned
+    integer, and values of other types, are formatted one at a time.
+
+    :param values: a NumPy integer array, the result of
+                   :func:`buffer_array`, or a sequence of values accepted by
+                   :class:`Quantity`
+    :param base: see :func:`formatter`
+    :param cutoff: see :func:`formatter`
+    :param digits: see :func:`formatter`
+    :param abbrev: see :func:`formatter`
+    :param out: a text or binary file to write each string to, followed by a
+                newline, instead of returning them. They are formatted and
+                written a chunk at a time.
+    :return: a list of strings, or the number of strings written to `out`
+    """
+    if out is not None:
+        return _write(out, values, lambda chunk: format_array(chunk, base, cutoff, digits, abbrev))
+
+    fmt = formatter(base=base, cutoff=cutoff, digits=digits, abbrev=abbrev, cache=False)
+    if digits > _MAX_DIGITS:
+        return _format_values(values, fmt, None)
+
+    def format_uint64(np, small):
+        return _format_uint64(np, small, base, cutoff, digits, abbrev)
+    return _format_values(values, fmt, format_uint64)
+
+
+def short_format_array(values, tolerance=None, base=None, out=None):
+    """Format each of `values` as :func:`short_formatter` would.
+
+    >>> short_format_array([1400605, 2000398934016, 999])
+    ['1.33Mi', '2T', '999B']
+
+    When `base` is not specified, the choice between decimal and binary
+    units is made for all of `values` at once. Otherwise this is like
+    :func:`format_array`.
+
+    :param values: a NumPy integer array, the result of
+                   :func:`buffer_array`, or a sequence of values accepted by
+                   :class:`Quantity`
+    :param tolerance: see :func:`short_formatter`
+    :param base: see :func:`short_formatter`
+    :param out: see :func:`format_array`
+    :return: a list of strings, or the number of strings written to `out`
+    """
+    if out is not None:
+        return _write(out, values, lambda chunk: short_format_array(chunk, tolerance, base))
+
+    fmt = short_formatter(tolerance=tolerance, base=base, cache=False)
+    if tolerance is None:
+        tolerance = 0.01
+
+    def format_uint64(np, small):
+        return _short_format_uint64(np, small, tolerance, base)
+    return _format_values(values, fmt, format_uint64)
+
+
+def write_humanized(out, values, spec='', sep='\n'):
+    """Format each of `values` with `spec` as :meth:`Quantity.__format__`
+    would, and write each string followed by `sep` to `out`.
+
+    >>> out = io.StringIO()
+    >>> write_humanized(out, [1400605, 1024, 0], '>10.6d')
+    3
+    >>> print(out.getvalue(), end='')
+     1.4006 MB
+      1.024 kB
+           0 B
+
+    The values are formatted, joined and written a chunk at a time, so
+    writing millions of values takes little memory. Each suffix and each
+    length of padding is built once, already encoded for a binary file, and
+    with NumPy the numbers in each chunk are made at once, as by
+    :func:`format_array`.
+
+    :param out: a text or binary file, e.g. :class:`io.StringIO` or
+                :class:`io.BytesIO`
+    :param values: an iterable of values accepted by :class:`Quantity`,
+                   e.g. a :class:`QuantityArray` or the result of
+                   :func:`buffer_array`
+    :param spec: a format spec, e.g. ``'d'``, ``'>10.6i'`` or ``'s'``
+    :param sep: the string written after each value
+    :return: the number of values written
+    :raises ValueError: if `spec` is invalid
+    :raises TypeError: if any of `values` is negative or not integral
+    """
+    try:
+        plan = _format_plans[spec]
+    except KeyError:
+        plan = _format_plans.compile(spec)
+    lines = _Lines(plan, _is_binary(out), sep)
+
+    written = 0
+    for chunk in _int_chunks(values, _WRITE_CHUNK_SIZE):
+        out.write(lines.join(chunk))
+        written += len(chunk)
+    return written
+
+
+class _Lines(object):
+    """Joins the strings `plan` makes for a chunk of values, each followed
+    by `sep`, from the numeric part of each string and a suffix and padding
+    built once and kept encoded if `binary`
+    """
+
+    def __init__(self, plan, binary, sep):
+        self.plan, self.binary = plan, binary
+        self.encode = (lambda text: text.encode('utf-8')) if binary else (lambda text: text)
+        self.sep = self.encode(sep)
+        self.width = plan.width or 0
+        self.pads = [self.encode(plan.fill * length) for length in range(self.width + 1)]
+        self.suffixes = {}  # (base, units) -> (suffix, its length in characters)
+
+        # the vectorized engine for the plan's numbers, if any
+        self.numbers = self.units = None
+        self.np = _numpy()
+        if self.np is None:
+            return
+        if plan.short:
+            self.numbers = lambda small: _short_numbers(self.np, small, 0.01, plan.base, binary)
+            self.units = _short_units()
+        elif plan.base is not None:
+            cutoff, digits, _, abbrev = plan.long_opts[plan.base]
+            if digits <= _MAX_DIGITS:
+                self.numbers = lambda small: _long_numbers(
+                    self.np, small, plan.base, cutoff, digits, binary)
+                self.units = [(plan.base, units) for units in _long_units(plan.base, abbrev)]
+        else:
+            _, decimal_digits, _, abbrev = plan.long_opts[1000]
+            cutoff, digits, _, _ = plan.long_opts[1024]
+            if max(decimal_digits, digits) <= _MAX_DIGITS:
+                self.numbers = lambda small: _auto_long_numbers(
+                    self.np, small, cutoff, decimal_digits, digits, binary)
+                self.units = [(base, units) for base in (1000, 1024)
+                              for units in _long_units(base, abbrev)]
+
+    def suffix(self, base, units):
+        """The suffix after a number in `units`, and its length"""
+        try:
+            return self.suffixes[base, units]
+        except KeyError:
+            suffix = self.plan._suffix(base, units)
+            result = self.suffixes[base, units] = self.encode(suffix), len(suffix)
+            return result
+
+    def join(self, values):
+        """The strings for `values`, each followed by `sep`"""
+        if self.numbers is not None:
+            fits, small = _uint64_values(self.np, _as_array(self.np, values))
+            if fits is None:
+                return self.join_numbers(small)
+
+        empty = self.encode('')
+        humanize, suffix, width, pads = self.plan.humanize, self.suffix, self.width, self.pads
+        alignment, binary = self.plan.alignment, self.binary
+        pieces = []
+        for value in values:
+            base, number, units = humanize(value)
+            suffix_, suffix_length = suffix(base, units)
+            if binary:
+                number = number.encode('ascii')
+            pad = width - len(number) - suffix_length
+            if pad <= 0:
+                pieces += [number, suffix_, self.sep]
+            elif alignment == '<':
+                pieces += [number, suffix_, pads[pad], self.sep]
+            elif alignment == '>':
+                pieces += [pads[pad], number, suffix_, self.sep]
+            else:
+                pieces += [pads[pad // 2], number, suffix_, pads[pad - pad // 2], self.sep]
+        return empty.join(pieces)
+
+    def join_numbers(self, small):
+        """The strings for `small`, a uint64 array, each followed by `sep`"""
+        np = self.np
+        numbers, units = self.numbers(small)
+        suffixes = [self.suffix(base, units_) for base, units_ in self.units]
+        lines = numbers + np.array([suffix for suffix, _ in suffixes], dtype=object)[units]
+        if self.width:
+            lengths = np.fromiter(map(len, numbers), dtype=np.int64, count=len(numbers))
+            lengths += np.array([length for _, length in suffixes], dtype=np.int64)[units]
+            pad = np.clip(self.width - lengths, 0, self.width)
+            pads = np.array(self.pads, dtype=object)
+            alignment = self.plan.alignment
+            if alignment == '<':
+                lines = lines + pads[pad]
+            elif alignment == '>':
+                lines = pads[pad] + lines
+            else:
+                lines = pads[pad // 2] + lines + pads[pad - pad // 2]
+        lines = lines + np.array([self.sep], dtype=object)
+        return self.encode('').join(lines.tolist())
+
+
+def format_column(values, spec=''):
+    """Format each of `values` with `spec` as :meth:`Quantity.__format__`
+    would, padded to the narrowest width that fits them all, for a column of
+    a table.
+
+    >>> format_column([1400605, 1024, 0])
+    ['1.335 MiB', '    1 KiB', '    0 B  ']
+    >>> format_column([1400605, 1024, 0], '_<')
+    ['1.335 MiB', '1 KiB____', '0 B______']
+
+    By default, or with ``'='`` alignment, the numbers are right-aligned and
+    the units left-aligned, like ``'{:=10}'.format(quantity)`` but with the
+    units padded only as much as the longest of them. Otherwise each string
+    is aligned as a whole.
+
+    Each value is formatted once: the widths are found while formatting,
+    then the strings are padded.
+
+    :param values: as for :func:`write_humanized`
+    :param spec: a format spec without a width, e.g. ``'d'``, ``'*=.8i'``
+                 or ``'>s'``
+    :return: a list of strings of equal length
+    :raises ValueError: if `spec` is invalid or has a width
+    """
+    fill, align, string_width, precision, type_ = Quantity.parse_spec(spec)
+    if string_width is not None:
+        raise ValueError("Format specifier {!r} for a column must not have a width".format(spec))
+    bare_spec = ('.{}'.format(precision) if precision is not None else '') + type_
+    try:
+        plan = _format_plans[bare_spec]
+    except KeyError:
+        plan = _format_plans.compile(bare_spec)
+    humanize = plan.humanize
+
+    numbers, units = [], []
+    number_width = units_width = 0
+    for chunk in _int_chunks(values, _WRITE_CHUNK_SIZE):
+        for value in chunk:
+            _, number, units_ = humanize(value)
+            numbers.append(number)
+            units.append(units_)
+            if len(number) > number_width:
+                number_width = len(number)
+            if len(units_) > units_width:
+                units_width = len(units_)
+
+    fill = fill if fill is not None else ' '
+    space = '' if plan.short else ' '
+    if align in (None, '='):
+        return [number.rjust(number_width, fill) + space + units_.ljust(units_width, fill)
+                for number, units_ in zip(numbers, units)]
+
+    strings = [number + space + units_ for number, units_ in zip(numbers, units)]
+    width = max(map(len, strings)) if strings else 0
+    if align == '<':
+        return [string.ljust(width, fill) for string in strings]
+    elif align == '>':
+        return [string.rjust(width, fill) for string in strings]
+    return [_center(string, width, fill) for string in strings]
+
+
+def buffer_array(buffer, dtype='<u8', offset=0, count=None, stride=None):
+    """The integers stored in `buffer`, read in place.
+
+    >>> counters = struct.pack('<3Q', 1400605, 1024, 0)
+    >>> format_array(buffer_array(counters))
+    ['1.335 MiB', '1 KiB', '0 B']
+
+    With NumPy, the result is a read-only NumPy array sharing memory with
+    `buffer`. Otherwise it is a sequence that unpacks each value as it's
+    needed. Either way, nothing is copied until it's formatted.
+
+    :param buffer: any object supporting the buffer protocol, e.g.
+                   `bytes`, `memoryview`, `array.array` or `mmap.mmap`
+    :param dtype: the type of each value, as a NumPy type string: a byte
+                  order of ``'<'`` (little-endian), ``'>'`` (big-endian) or
+                  ``'='`` (native), then ``'u'`` (unsigned) or ``'i'``
+                  (signed), then the size in bytes, 1, 2, 4 or 8
+    :param offset: the position in `buffer` of the first value, in bytes
+    :param count: the number of values. Defaults to as many as fit in
+                  `buffer`
+    :param stride: the distance between the start of each value and the
+                   next, in bytes, e.g. the size of a record containing the
+                   value. Defaults to the size of a value
+    :raises ValueError: if `dtype` isn't an integer type, or `buffer` isn't
+                        big enough for `count` values
+    """
+    view = memoryview(buffer)
+    if view.ndim != 1 or view.itemsize != 1:
+        # Python 2 can't cast a view, only copy it
+        view = view.cast('B') if hasattr(view, 'cast') else memoryview(view.tobytes())
+    code, itemsize = _struct_code(dtype)
+    stride = itemsize if stride is None else stride
+    if stride < itemsize or offset < 0:
+        raise ValueError("Values of {} bytes can't be {} bytes apart from offset {}"
+                         .format(itemsize, stride, offset))
+    available = max(0, (len(view) - offset - itemsize) // stride + 1)
+    if count is None:
+        count = available
+    elif count > available:
+        raise ValueError("Buffer of {} bytes holds only {} values at offset {}"
+                         .format(len(view), available, offset))
+
+    np = _numpy()
+    if np is None:
+        return _BufferValues(view, code, offset, count, stride)
+    array = np.ndarray(shape=(count,), dtype=np.dtype(code), buffer=view, offset=offset,
+                       strides=(stride,))
+    array.flags.writeable = False
+    return array
+
+
+def _struct_code(dtype):
+    """The `struct` code and size of a NumPy integer type string"""
+    match = re.match(r'([<>=|]?)([ui])([1248])$', str(dtype))
+    if match is None:
+        raise ValueError("Unsupported dtype {!r}".format(dtype))
+    order, kind, size = match.groups()
+    letter = {'1': 'b', '2': 'h', '4': 'i', '8': 'q'}[size]
+    return ({'': '=', '|': '='}.get(order, order) +
+            (letter.upper() if kind == 'u' else letter)), int(size)
+
+
+class _BufferValues(object):
+    """A sequence of the integers in a buffer, unpacked one at a time, like
+    the NumPy array :func:`buffer_array` makes
+    """
+
+    def __init__(self, view, code, offset, count, stride):
+        self.view, self.code, self.offset, self.count, self.stride = (
+            view, code, offset, count, stride)
+        self.unpack_from = struct.Struct(code).unpack_from
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.count)
+            return _BufferValues(self.view, self.code, self.offset + start * self.stride,
+                                 len(range(start, stop, step)), self.stride * step)
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("index out of range")
+        return self.unpack_from(self.view, self.offset + index * self.stride)[0]
+
+    def __iter__(self):
+        if self.stride == struct.calcsize(self.code) and _iter_unpack is not None:
+            end = self.offset + self.count * self.stride
+            return (value for value, in _iter_unpack(self.code, self.view[self.offset:end]))
+        unpack_from, view = self.unpack_from, self.view
+        return (unpack_from(view, position)[0] for position in
+                range(self.offset, self.offset + self.count * self.stride, self.stride))
+
+
+def _is_binary(out):
+    """Whether `out` is a file that takes bytes rather than text"""
+    if isinstance(out, io.TextIOBase):
+        return False
+    return isinstance(out, (io.RawIOBase, io.BufferedIOBase)) or 'b' in getattr(out, 'mode', '')
+
+
+def _write(out, values, format_chunk):
+    """Format `values` a chunk at a time with `format_chunk`, and write each
+    string to `out` on a line
+    """
+    binary = _is_binary(out)
+    written = 0
+    for chunk in _chunks(values, _WRITE_CHUNK_SIZE):
+        text = '\n'.join(format_chunk(chunk)) + '\n'
+        out.write(text.encode('utf-8') if binary else text)
+        written += len(chunk)
+    return written
+
+
+def _chunks(values, size):
+    """Split `values` into non-empty sequences of at most `size` values,
+    slicing it in place if possible
+    """
+    if hasattr(values, '__getitem__') and hasattr(values, '__len__'):
+        for start in range(0, len(values), size):
+            yield values[start:start + size]
+        return
+    iterator = iter(values)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _format_values(values, fmt, format_uint64):
+    """Format `values` with `format_uint64` where possible, and with `fmt`
+    one at a time otherwise.
+    """
+    np = _numpy()
+    if np is None:
+        return [fmt(value) for value in values]
+
+    array = _as_array(np, values)
+    if format_uint64 is None:
+        return [fmt(value) for value in array.tolist()]
+
+    fits, small = _uint64_values(np, array)
+    if fits is None:
+        return format_uint64(np, small).tolist()
+
+    results = np.empty(len(array), dtype=object)
+    results[fits] = format_uint64(np, small)
+    for index in np.flatnonzero(~fits):
+        results[index] = fmt(array[index])
+    return results.tolist()
+
+
+def _as_array(np, values):
+    """Convert `values` to a flat array without changing the type of any
+    value, e.g. turning ``[1, '2 B']`` into an array of strings.
+    """
+    array = np.asarray(values)
+    if array.dtype.kind not in 'iuO' and not isinstance(values, np.ndarray):
+        array = np.empty(len(values), dtype=object)
+        array[:] = list(values)
+    return array.reshape(-1)
+
+
+def _uint64_values(np, array):
+    """Split `array` into the values we can format as a uint64 array and the
+    rest.
+
+    :return: ``(fits, small)``, where `small` is a uint64 array of the values
+             selected by the boolean mask `fits`. `fits` is `None` if every
+             value is selected.
+    """
+    if array.dtype.kind == 'u':
+        return None, array.astype(np.uint64, copy=False)
+    elif array.dtype.kind == 'i':
+        negative = array < 0
+        if negative.any():
+            raise TypeError("Value {} must be non-negative".format(array[negative][0]))
+        return None, array.astype(np.uint64)
+    else:
+        fits = np.fromiter((value.__class__ in _PLAIN_INTS and 0 <= value < _UINT64_LIMIT
+                            for value in array),
+                           dtype=bool, count=len(array))
+        small = np.array(array[fits].tolist(), dtype=np.uint64)
+        return (None if fits.all() else fits), small
+
+
+def _format_uint64(np, values, base, cutoff, digits, abbrev):
+    """Format a uint64 array as :func:`formatter` would.
+
+    :return: an object array of strings
+    """
+    numbers, units = _long_numbers(np, values, base, cutoff, digits)
+    unit_strings = np.array([' ' + units_ for units_ in _long_units(base, abbrev)], dtype=object)
+    return numbers + unit_strings[units]
+
+
+def _long_numbers(np, values, base, cutoff, digits, binary=False):
+    """The numbers :func:`formatter` shows for a uint64 array, and the units
+    for each, as indexes into ``_long_units(base, abbrev)``.
+
+    :param binary: make the numbers `bytes` rather than text
+    :return: ``(numbers, units)``, an object array and an int array
+    """
+    exp, whole, rem, den = _divide(np, values, base, cutoff)
+    exact = rem == 0
+    numbers = (_whole_strings(np, binary)[whole] +
+               _fractions(np, whole, rem, den, digits, exact, binary))
+    return numbers, 2 * exp + (exact & (whole == 1))
+
+
+def _auto_long_numbers(np, values, cutoff, decimal_digits, digits, binary=False):
+    """Like `_long_numbers`, for the base `bytesize._auto_division` picks for
+    each value: decimal if the value is a whole number of decimal units,
+    otherwise binary with `cutoff`. The units index into the decimal units
+    followed by the binary units.
+    """
+    _, _, rem, _ = _divide(np, values, 1000, 1000)
+    decimal = rem == 0
+    numbers = np.empty(len(values), dtype=object)
+    units = np.empty(len(values), dtype=np.int64)
+    numbers[decimal], units[decimal] = _long_numbers(
+        np, values[decimal], 1000, 1000, decimal_digits, binary)
+    numbers[~decimal], units[~decimal] = _long_numbers(
+        np, values[~decimal], 1024, cutoff, digits, binary)
+    units[~decimal] += 2 * len(UNITS_TABLE[1000])
+    return numbers, units
+
+
+def _long_units(base, abbrev):
+    """The plural and singular units for each exponent of `base`, in turn"""
+    units = []
+    for abbrev_prefix, prefix in UNITS_TABLE[base]:
+        if abbrev:
+            units += [abbrev_prefix + 'B'] * 2
+        else:
+            units += [prefix + 'bytes', prefix + 'byte']
+    return units
+
+
+def _short_format_uint64(np, values, tolerance, base):
+    """Format a uint64 array as :func:`short_formatter` would.
+
+    :return: an object array of strings
+    """
+    numbers, units = _short_numbers(np, values, tolerance, base)
+    unit_strings = np.array([units_ for _, units_ in _short_units()], dtype=object)
+    return numbers + unit_strings[units]
+
+
+def _short_numbers(np, values, tolerance, base, binary=False):
+    """The numbers :func:`short_formatter` shows for a uint64 array, and the
+    units for each, as indexes into ``_short_units()``.
+
+    :param binary: make the numbers `bytes` rather than text
+    :return: ``(numbers, units)``, an object array and an int array
+    """
+    binary_units = len(UNITS_TABLE[1000])
+
+    if base is None:
+        # guess the base for every value at once, then take each quotient
+        # from the division at the guessed base
+        exp, whole, rem, den = _divide(np, values, 1000, 1000)
+        decimal = _at_most(np, rem, den, tolerance)
+        exp_b, whole_b, rem_b, den_b = _divide(np, values, 1024, 1000)
+
+        exp = np.where(decimal, exp, exp_b + binary_units)
+        whole = np.where(decimal, whole, whole_b)
+        rem = np.where(decimal, rem, rem_b)
+        den = np.where(decimal, den, den_b)
+        # round down to the guessed decimal unit
+        omit = decimal | (rem == 0) | (whole >= 100)
+    else:
+        exp, whole, rem, den = _divide(np, values, base, 1000)
+        if base == 1024:
+            exp = exp + binary_units
+        omit = (rem == 0) | (whole >= 100)
+
+    numbers = (_whole_strings(np, binary)[whole] +
+               _fractions(np, whole, rem, den, 4, omit, binary))
+    return numbers, exp
+
+
+def _short_units():
+    """The ``(base, units)`` for each decimal exponent, then each binary one"""
+    return [(base, prefix or 'B') for base in (1000, 1024) for prefix, _ in UNITS_TABLE[base]]
+
+
+_WHOLE_STRINGS = {}  # binary -> object array of `str(whole)` for each whole part
+
+
+def _whole_strings(np, binary):
+    """An object array of each whole part a quotient may have, as a string"""
+    try:
+        return _WHOLE_STRINGS[binary]
+    except KeyError:
+        strings = [str(ww) for ww in range(1025)]
+        if binary:
+            strings = [string.encode('ascii') for string in strings]
+        strings = _WHOLE_STRINGS[binary] = np.array(strings, dtype=object)
+        return strings
+
+
+def _divide(np, values, base, cutoff):
+    """Vectorized `bytesize._IntQuotient.division` for a uint64 array.
+
+    :return: arrays ``(exp, whole, rem, den)``
+    """
+    thresholds = np.array([tt for tt in _thresholds(base, cutoff) if tt < _UINT64_LIMIT],
+                          dtype=np.uint64)
+    powers = np.array([base**exp for exp in range(len(thresholds) + 1)], dtype=np.uint64)
+
+    exp = np.searchsorted(thresholds, values, side='right')
+    den = powers[exp]
+    return exp, values // den, values % den, den
+
+
+def _at_most(np, rem, den, tolerance):
+    """Vectorized `bytesize._IntQuotient.fractional_at_most`"""
+    ratio = rem / den
+    result = ratio <= tolerance
+    # settle anything within floating-point error of `tolerance` exactly
+    for index in np.flatnonzero(np.abs(ratio - tolerance) <= 1e-9):
+        quotient = _IntQuotient(0, int(rem[index]), int(den[index]))
+        result[index] = quotient.fractional_at_most(tolerance)
+    return result
+
+
+def _fractions(np, whole, rem, den, digits, omit, binary=False):
+    """The fractional part of each quotient ``whole + rem / den``, as it
+    appears in the first `digits` characters of `_Quotient.decimalize`, e.g.
+    ``'.5'``, ``'.000'`` or ``'.'``.
+
+    :param binary: make the strings `bytes` rather than text
+    :return: an object array of strings, with ``''`` where `omit` is true
+    """
+    # the first `digits` characters of the quotient include `frac_len`
+    # fractional digits. since ``rem < den <= 2**60``, ``rem * 10`` fits
+    int_len = 1 + (whole >= 10).astype(np.int64) + (whole >= 100) + (whole >= 1000)
+    frac_len = np.maximum(digits - 1 - int_len, 0)
+    frac = np.zeros_like(rem)
+    for position in range(digits - 2):
+        active = position < frac_len
+        rem10 = rem * np.uint64(10)
+        frac = np.where(active, frac * np.uint64(10) + rem10 // den, frac)
+        rem = np.where(active, rem10 % den, rem)
+
+    # `_Quotient.decimalize` drops trailing zeros iff the expansion ends
+    # within the digits we show
+    strip = (rem == 0) & ~omit
+    for _ in range(digits - 2):
+        zero = strip & (frac_len > 0) & (frac % np.uint64(10) == 0)
+        frac = np.where(zero, frac // np.uint64(10), frac)
+        frac_len = np.where(zero, frac_len - 1, frac_len)
+
+    # build each distinct fractional part only once
+    offsets = np.cumsum([0] + [10**length for length in range(digits - 2)], dtype=np.uint64)
+    code = np.where(omit, np.uint64(_OMIT), frac + offsets[frac_len])
+    codes, inverse = np.unique(code, return_inverse=True)
+    lengths = np.searchsorted(offsets, codes, side='right') - 1
+    fracs = codes - offsets[lengths]
+    strings = [
+        '' if code_ == _OMIT else '.' + (str(frac_).rjust(length, '0') if length else '')
+        for code_, frac_, length in zip(codes.tolist(), fracs.tolist(), lengths.tolist())
+    ]
+    if binary:
+        strings = [string.encode('ascii') for string in strings]
+    return np.array(strings, dtype=object)[inverse.reshape(-1)]
@@ -0,0 +1,763 @@
+"""The ``bytesize`` command: humanize columns of byte counts in text.
+
+Like ``numfmt``, ``bytesize`` copies lines from its input to its output,
+replacing numbers in the selected fields with strings formatted by
+:meth:`Quantity.__format__`:
+
+.. code-block:: sh
+
+    $ find . -type f -printf '%s %p\\n' | bytesize --format '>10.6d'
+
+Everything but the selected fields is copied unchanged, byte for byte.
+Input is read and written in large blocks of whole lines.
+"""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from builtins import *
+
+import argparse
+import collections
+import heapq
+import io
+import mmap
+import multiprocessing
+import os
+import pickle
+import re
+import shutil
+import stat
+import sys
+import tempfile
+from fractions import Fraction
+
+from . import UNITS_TABLE, Quantity, UnitNoExistError, _parse_size, _UNIT_SUFFIXES
+from .usage import walk_usage, _fsencode
+
+_BLOCK_SIZE = 1 << 20
+_CHUNK_SIZE = 4 << 20  # for each process
+_MEMO_SIZE = 1 << 16
+
+_INVALID_CHOICES = ('abort', 'fail', 'warn', 'ignore')
+
+
+def main(argv=None, stdin=None, stdout=None, stderr=None):
+    """Run the ``bytesize`` command.
+
+    :param argv: the command-line arguments, not including the program name.
+                 Defaults to `sys.argv`
+    :param stdin: a binary stream to read instead of standard input
+    :param stdout: a binary stream to write instead of standard output
+    :param stderr: a text stream to write errors to instead of standard error
+    :return: the exit status
+    """
+    stdin = stdin if stdin is not None else _binary(sys.stdin)
+    stdout = stdout if stdout is not None else _binary(sys.stdout)
+    stderr = stderr if stderr is not None else sys.stderr
+
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ['sort']:
+        return _sort_main(argv[1:], stdin, stdout, stderr)
+    if argv[:1] == ['du']:
+        return _du_main(argv[1:], stdout, stderr)
+
+    parser = _parser()
+    args = parser.parse_args(argv)
+    try:
+        if args.jobs < 0:
+            raise ValueError("--jobs must not be negative")
+        fields, delimiter = _parse_fields(args.field), _parse_delimiter(args.delimiter)
+        if args.from_human:
+            if args.format is not None:
+                raise ValueError("--format can't be used with --from-human")
+            converter = _Dehumanizer(fields, delimiter, iec=args.iec, rounding=args.round)
+        else:
+            if args.iec:
+                raise ValueError("--iec can only be used with --from-human")
+            converter = _Humanizer(fields, delimiter, spec=args.format or '')
+    except ValueError as ee:
+        parser.error(str(ee))
+
+    status = 0
+    for path in args.files or ['-']:
+        if path == '-':
+            result = _filter(converter, stdin, stdout, stderr, path, args)
+        else:
+            try:
+                stream = open(path, 'rb')
+            except (IOError, OSError) as ee:  # IOError on Python 2
+                stderr.write("bytesize: {}: {}\n".format(path, ee.strerror or ee))
+                status = max(status, 1)
+                continue
+            with stream:
+                result = _filter(converter, stream, stdout, stderr, path, args)
+        if result is None:
+            stdout.flush()
+            return 2
+        status = max(status, result)
+    stdout.flush()
+    return status
+
+
+def main_exit():
+    """Run the ``bytesize`` command and exit, for the console script"""
+    sys.exit(main())
+
+
+def _parser():
+    parser = argparse.ArgumentParser(
+        prog='bytesize',
+        description="Replace byte counts in the selected fields of each line with "
+                    "human-readable sizes, or the reverse, copying everything else unchanged.")
+    parser.add_argument('files', nargs='*', metavar='FILE',
+                        help="files to read instead of standard input, or - for standard input")
+    parser.add_argument('-f', '--field', default='1', metavar='FIELDS',
+                        help="fields to replace, numbered from 1, like cut(1): e.g. 1,3 or 2-4 or "
+                             "3- (default: 1)")
+    parser.add_argument('-d', '--delimiter', metavar='CHAR',
+                        help="field delimiter, e.g. , for CSV or '\\t' for TSV. Quotes are not "
+                             "interpreted. (default: runs of whitespace)")
+    parser.add_argument('--format', metavar='SPEC',
+                        help="format spec for each size, as for Quantity.__format__, e.g. "
+                             "d, >10.6i or s (default: '')")
+    parser.add_argument('--from-human', action='store_true',
+                        help="instead, replace human-readable sizes like '1.335 MiB', '2T' or "
+                             "'10 kilobytes' with byte counts")
+    parser.add_argument('--iec', action='store_true',
+                        help="with --from-human, single-letter units like 'G' are binary, as in "
+                             "the output of df -h")
+    parser.add_argument('--round', choices=('up', 'down', 'nearest'), default='up',
+                        help="with --from-human, how to round sizes to a whole byte "
+                             "(default: up)")
+    parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                        help="convert files (but not standard input) in N processes, or one for "
+                             "each CPU if N is 0 (default: 1)")
+    parser.add_argument('--header', type=int, default=0, metavar='N',
+                        help="copy the first N lines of each input unchanged")
+    parser.add_argument('--invalid', choices=_INVALID_CHOICES, default='fail',
+                        help="what to do with fields that aren't byte counts: abort immediately, "
+                             "or copy them unchanged and report them and fail at the end, only "
+                             "report them, or ignore them (default: fail)")
+    return parser
+
+
+def _sort_parser():
+    parser = argparse.ArgumentParser(
+        prog='bytesize sort',
+        description="Sort lines by a human-readable size, like sort -h but with every unit "
+                    "that bytesize understands. Lines without a size count as smallest, and "
+                    "lines with equal sizes keep their order.")
+    parser.add_argument('files', nargs='*', metavar='FILE',
+                        help="files to read instead of standard input, or - for standard input")
+    parser.add_argument('-k', '--key', type=int, default=1, metavar='FIELD',
+                        help="sort by this field, numbered from 1 (default: 1)")
+    parser.add_argument('-d', '--delimiter', metavar='CHAR',
+                        help="field delimiter (default: runs of whitespace)")
+    parser.add_argument('-r', '--reverse', action='store_true',
+                        help="sort largest first")
+    parser.add_argument('--iec', action='store_true',
+                        help="single-letter units like 'G' are binary, as in the output of df -h")
+    parser.add_argument('-S', '--buffer-size', default='256 MiB', metavar='SIZE',
+                        help="sort runs of about SIZE, at least 256 KiB, in memory, and merge "
+                             "them from temporary files, e.g. 1G or '512 MiB' (default: 256 MiB)")
+    parser.add_argument('-T', '--temporary-directory', metavar='DIR',
+                        help="put temporary files in DIR (default: the system's)")
+    return parser
+
+
+def _sort_main(argv, stdin, stdout, stderr):
+    parser = _sort_parser()
+    args = parser.parse_args(argv)
+    try:
+        if args.key < 1:
+            raise ValueError("invalid key field {}".format(args.key))
+        sizer = _Dehumanizer(({args.key - 1}, None), _parse_delimiter(args.delimiter), iec=args.iec)
+        numerator, denominator = sizer.parse(args.buffer_size.encode('utf-8'))
+        budget = numerator // denominator
+        if budget < 1:
+            raise ValueError("invalid buffer size {!r}".format(args.buffer_size))
+    except ValueError as ee:
+        parser.error(str(ee))
+
+    errors = []
+
+    def onerror(path, error):
+        errors.append(error)
+        stderr.write("bytesize sort: {}: {}\n".format(path, error.strerror or error))
+
+    lines = _lines(args.files or ['-'], stdin, onerror)
+    stdout.writelines(_external_sort(lines, sizer.size, args.reverse, budget,
+                                     args.temporary_directory))
+    stdout.flush()
+    return 1 if errors else 0
+
+
+def _du_parser():
+    parser = argparse.ArgumentParser(
+        prog='bytesize du',
+        description="Print the disk usage of each directory, like du, listing directories "
+                    "in parallel. Symbolic links are not followed, and files with several hard "
+                    "links are counted once.")
+    parser.add_argument('paths', nargs='*', metavar='PATH',
+                        help="files and directories to measure (default: .)")
+    parser.add_argument('--format', default='', metavar='SPEC',
+                        help="format spec for each size, as for Quantity.__format__, e.g. "
+                             "d, >10.6i or s (default: '')")
+    parser.add_argument('-b', '--apparent-size', action='store_true',
+                        help="add up file sizes rather than the disk space allocated to files")
+    parser.add_argument('-s', '--summarize', action='store_true',
+                        help="print only the total of each PATH, like --max-depth 0")
+    parser.add_argument('-d', '--max-depth', type=int, metavar='N',
+                        help="print only directories at most N levels below each PATH")
+    parser.add_argument('-c', '--total', action='store_true',
+                        help="also print the total of all the PATHs")
+    parser.add_argument('-x', '--one-file-system', action='store_true',
+                        help="skip directories on other filesystems than each PATH")
+    parser.add_argument('--cache', metavar='FILE',
+                        help="save the contents of each directory in the SQLite database FILE, "
+                             "and only list directories modified since the last run")
+    parser.add_argument('-t', '--threads', type=int, metavar='N',
+                        help="list N directories at once (default: a few more than the number "
+                             "of CPUs)")
+    return parser
+
+
+def _du_main(argv, stdout, stderr):
+    parser = _du_parser()
+    args = parser.parse_args(argv)
+    try:
+        format(Quantity(0), args.format)  # raises ValueError for a bad spec
+        if args.max_depth is not None and args.max_depth < 0:
+            raise ValueError("--max-depth must not be negative")
+        if args.summarize and args.max_depth is not None:
+            raise ValueError("--summarize can't be used with --max-depth")
+        if args.threads is not None and args.threads < 1:
+            raise ValueError("--threads must be positive")
+    except ValueError as ee:
+        parser.error(str(ee))
+
+    errors = []
+
+    def onerror(error):
+        errors.append(error)
+        stderr.write("bytesize du: {}\n".format(error))
+
+    def write(size, path):
+        stdout.write(format(size, args.format).encode('utf-8') + b'\t' + _fsencode(path) + b'\n')
+
+    # as in ``du``, a file linked from several PATHs is counted in the first
+    grand_total, seen = 0, set()
+    for path in args.paths or ['.']:
+        try:
+            for directory, size in walk_usage(path, args.apparent_size, args.one_file_system,
+                                              args.threads, onerror, args.cache,
+                                              0 if args.summarize else args.max_depth, seen):
+                write(size, directory)
+        except OSError as ee:
+            onerror(ee)
+            continue
+        grand_total += size
+    if args.total:
+        write(Quantity(grand_total), 'total')
+    stdout.flush()
+    return 1 if errors else 0
+
+
+def _lines(paths, stdin, onerror):
+    """The lines of each file in `paths`, each ending with a newline.
+
+    :param onerror: called with the path and the error of each file that
+                    can't be opened, which is then skipped
+    """
+    for path in paths:
+        try:
+            stream = stdin if path == '-' else open(path, 'rb')
+        except (IOError, OSError) as ee:  # IOError on Python 2
+            onerror(path, ee)
+            continue
+        try:
+            for block in _blocks(stream):
+                # split on newlines only, unlike `bytes.splitlines`, which
+                # also splits on e.g. a bare '\r'
+                lines = block.split(b'\n')
+                last = lines.pop()
+                for line in lines:
+                    yield line + b'\n'
+                if last:
+                    yield last + b'\n'
+        finally:
+            if stream is not stdin:
+                stream.close()
+
+
+# about how much memory a line takes in a run, besides its own length
+_RECORD_OVERHEAD = 150
+_MERGE_FAN_IN = 64
+_RUN_BATCH = 4096
+# smaller budgets are raised to this, so that runs aren't a few lines each
+_MIN_BUDGET = 256 * 1024
+
+
+def _external_sort(lines, size, reverse, budget, directory=None):
+    """Sort `lines` by ``size(line)``, which may be `None`, stably.
+
+    Runs of about `budget` bytes, but at least `_MIN_BUDGET`, are sorted in
+    memory. If there's more than one, each is saved to a temporary file in
+    `directory`, then the runs are merged, at most `_MERGE_FAN_IN` at a time.
+
+    :return: a generator of the sorted lines
+    """
+    # records are ``(key, number, line)``, so they sort by size, and then by
+    # where they were in `lines`, in either direction, without comparing
+    # lines, and plain `heapq.merge` keeps them in order
+    budget = max(budget, _MIN_BUDGET)
+    run, used = [], 0
+    runs = []
+    workdir = None
+    try:
+        for number, line in enumerate(lines):
+            value = size(line)
+            # no size sorts before every size
+            value = -1 if value is None else value
+            run.append((-value if reverse else value, number, line))
+            used += len(line) + _RECORD_OVERHEAD
+            if used >= budget:
+                if workdir is None:
+                    workdir = tempfile.mkdtemp(prefix='bytesize-sort-', dir=directory)
+                run.sort()
+                runs.append(_write_run(run, workdir))
+                run, used = [], 0
+
+        run.sort()
+        if not runs:
+            for _, _, line in run:
+                yield line
+            return
+        if run:
+            runs.append(_write_run(run, workdir))
+        del run
+
+        while len(runs) > _MERGE_FAN_IN:
+            runs = [_write_run(_merge_runs(runs[ii:ii + _MERGE_FAN_IN]), workdir)
+                    for ii in range(0, len(runs), _MERGE_FAN_IN)]
+        for _, _, line in _merge_runs(runs):
+            yield line
+    finally:
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _write_run(records, directory):
+    """Save sorted `records` to a file, in batches"""
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as ff:
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= _RUN_BATCH:
+                pickle.dump(batch, ff, pickle.HIGHEST_PROTOCOL)
+                batch = []
+        if batch:
+            pickle.dump(batch, ff, pickle.HIGHEST_PROTOCOL)
+        return ff.name
+
+
+def _read_run(path):
+    with open(path, 'rb') as ff:
+        while True:
+            try:
+                batch = pickle.load(ff)
+            except EOFError:
+                break
+            for record in batch:
+                yield record
+    os.remove(path)
+
+
+def _merge_runs(paths):
+    """Merge the sorted records in the runs at `paths`"""
+    return heapq.merge(*[_read_run(path) for path in paths])
+
+
+def _binary(stream):
+    return getattr(stream, 'buffer', stream)
+
+
+def _parse_fields(text):
+    """Parse a list of fields like ``'1,3-4,6-'``.
+
+    :return: ``(indices, open_from)``: a set of 0-based field indices, and
+             the index from which every field is selected, or `None`
+    """
+    indices = set()
+    open_from = None
+    for part in text.split(','):
+        start, dash, stop = part.partition('-')
+        try:
+            start = int(start) if start else 1
+            stop = int(stop) if stop else None
+        except ValueError:
+            raise ValueError("invalid field list {!r}".format(text))
+        if start < 1 or (stop is not None and stop < start) or (dash and not part.strip('-')):
+            raise ValueError("invalid field list {!r}".format(text))
+        if not dash:
+            indices.add(start - 1)
+        elif stop is None:
+            open_from = start - 1 if open_from is None else min(open_from, start - 1)
+        else:
+            indices.update(range(start - 1, stop))
+    return indices, open_from
+
+
+def _parse_delimiter(text):
+    if text is None:
+        return None
+    if text == '\\t':
+        text = '\t'
+    if len(text) != 1:
+        raise ValueError("the delimiter must be a single character")
+    return text.encode('latin-1')
+
+
+class _Converter(object):
+    """Replaces the selected fields in blocks of whole lines.
+
+    Each block is processed with a single call to `re.sub`, using a pattern
+    compiled once for the selected fields. Replacements are memoized, since
+    the same sizes tend to recur.
+
+    Subclasses define `convert`.
+    """
+
+    # a field separated by whitespace
+    whitespace_field = br'\S+'
+
+    def __init__(self, fields, delimiter):
+        indices, open_from = fields
+        self.memo = {}
+
+        if delimiter is None:
+            lead, separator = br'([ \t\r\f\v]*)', br'([ \t\r\f\v]+)'
+            field = br'(' + self.whitespace_field + br')'
+            self.tokenize = re.compile(br'[ \t\r\f\v]+|' + self.whitespace_field).findall
+        else:
+            escaped = re.escape(delimiter)
+            lead, field, separator = br'()', br'([^' + escaped + br'\r\n]*)', br'(' + escaped + br')'
+
+        if open_from is None:
+            # match the fields up to the last selected one, as groups
+            # alternating between separators and fields
+            pattern = b''
+            for _ in range(max(indices)):
+                pattern = br'(?:' + separator + field + pattern + br')?'
+            self.pattern = re.compile(br'(?m)^' + lead + field + pattern)
+            self.positions = sorted(2 * index + 1 for index in indices)
+        else:
+            # match whole lines, and split them
+            self.pattern = re.compile(br'(?m)^[^\n]+')
+            self.positions = None
+        self.delimiter = delimiter
+        self.indices, self.open_from = indices, open_from
+
+    def block(self, data, stop_at_error=False):
+        """Replace the selected fields in `data`, which consists of whole
+        lines.
+
+        :return: ``(output, errors)``, where `errors` is a list of
+                 ``(line, message)`` with `line` numbered from 0 within
+                 `data`. If `stop_at_error`, stop at the first error, and
+                 only output the lines before it.
+        """
+        memo = self.memo
+        positions = self.positions
+        errors = []
+
+        def replace(field, offset):
+            try:
+                return memo[field]
+            except KeyError:
+                pass
+            try:
+                replacement = self.convert(field)
+            except ValueError as ee:
+                errors.append((offset, str(ee)))
+                if stop_at_error:
+                    raise _Stop()
+                return field
+            if len(memo) >= _MEMO_SIZE:
+                memo.clear()
+            memo[field] = replacement
+            return replacement
+
+        if positions is None:
+            def substitute(match):
+                return self.replace_line(match.group(), match.start(), replace)
+        elif positions == [1]:
+            def substitute(match):
+                lead, field = match.group(1, 2)
+                return lead + replace(field, match.start())
+        else:
+            def substitute(match):
+                parts = [part for part in match.groups() if part is not None]
+                for position in positions:
+                    if position < len(parts) and parts[position]:
+                        parts[position] = replace(parts[position], match.start())
+                return b''.join(parts)
+
+        try:
+            output = self.pattern.sub(substitute, data)
+        except _Stop:
+            line_start = data.rfind(b'\n', 0, errors[0][0]) + 1
+            output = self.pattern.sub(substitute, data[:line_start])
+
+        numbered = []
+        line = previous = 0
+        for offset, message in errors:
+            line += data.count(b'\n', previous, offset)
+            previous = offset
+            numbered.append((line, message))
+        return output, numbered
+
+    def replace_line(self, line, offset, replace):
+        """Replace the selected fields in `line`, when the selection is
+        open-ended
+        """
+        if self.delimiter is None:
+            # fields and separators alternate
+            tokens = self.tokenize(line)
+            first, step, joiner = (1 if tokens[0][:1].isspace() else 0), 2, b''
+        else:
+            tokens = line.split(self.delimiter)
+            first, step, joiner = 0, 1, self.delimiter
+
+        cr = tokens[-1].endswith(b'\r')
+        if cr:
+            tokens[-1] = tokens[-1][:-1]
+        for position in range(first, len(tokens), step):
+            index = (position - first) // step
+            if tokens[position] and (index in self.indices or index >= self.open_from):
+                tokens[position] = replace(tokens[position], offset)
+        return joiner.join(tokens) + (b'\r' if cr else b'')
+
+
+class _Humanizer(_Converter):
+    """Replaces byte counts with strings formatted with `spec`"""
+
+    def __init__(self, fields, delimiter, spec):
+        super(_Humanizer, self).__init__(fields, delimiter)
+        self.spec = spec
+        format(Quantity(0), spec)  # raises ValueError for a bad spec
+
+    def convert(self, field):
+        """The replacement for `field`
+
+        :raises ValueError: if `field` is not a byte count
+        """
+        if not field.isdigit():
+            raise ValueError("invalid number: {!r}".format(field.decode('latin-1')))
+        try:
+            return format(Quantity(int(field)), self.spec).encode('utf-8')
+        except UnitNoExistError:
+            raise ValueError("too large: {!r}".format(field.decode('latin-1')))
+
+
+class _Dehumanizer(_Converter):
+    """Replaces human-readable sizes with byte counts.
+
+    Sizes are parsed by `bytesize._parse_size`, so they may use any of the
+    units that :class:`Quantity` accepts, and also the bare prefixes that
+    :func:`short_formatter` produces, like ``'1.33Mi'``. With `iec`, the
+    single letters ``K``, ``M``, ``G`` etc. are binary, as in the output of
+    ``df -h``. A unit may be separated from its number by whitespace, even
+    when fields are separated by whitespace.
+
+    Since sizes are usually rounded when formatted, we round to a whole
+    byte: `rounding` is ``'up'``, ``'down'`` or ``'nearest'``.
+    """
+
+    def __init__(self, fields, delimiter, iec=False, rounding='up'):
+        self.suffixes = dict(_UNIT_SUFFIXES)
+        for base, subtable in UNITS_TABLE.items():
+            for exp, (abbrev, _) in enumerate(subtable[1:], 1):
+                self.suffixes[abbrev] = (base**exp, 1)
+        self.suffixes['K'] = self.suffixes['k']
+        if iec:
+            for exp, letter in enumerate('KMGTPEZY', 1):
+                self.suffixes[letter] = (1024**exp, 1)
+            self.suffixes['k'] = self.suffixes['K']
+        self.rounding = rounding
+
+        units = br'|'.join(re.escape(unit.encode('ascii'))
+                           for unit in sorted(self.suffixes, key=len, reverse=True))
+        # a number may be followed by a unit in the next word, e.g. '1.5 KiB'
+        self.whitespace_field = (br'\S*[0-9](?:[ \t]+(?:' + units + br'))?(?!\S)|\S+')
+        super(_Dehumanizer, self).__init__(fields, delimiter)
+
+    def parse(self, field):
+        """The size in `field` in bytes, as ``(numerator, denominator)``
+
+        :raises ValueError: if `field` is not a size
+        """
+        if field.isdigit():
+            return int(field), 1
+        try:
+            parsed = _parse_size(field.decode('ascii'), self.suffixes)
+        except UnicodeDecodeError:
+            parsed = None
+        if parsed is None or parsed[0] < 0:
+            raise ValueError("invalid size: {!r}".format(field.decode('latin-1')))
+        return parsed
+
+    def convert(self, field):
+        """The replacement for `field`
+
+        :raises ValueError: if `field` is not a size
+        """
+        if field.isdigit():
+            return field
+        numerator, denominator = self.parse(field)
+        whole, remainder = divmod(numerator, denominator)
+        if remainder and (self.rounding == 'up' or
+                          (self.rounding == 'nearest' and 2 * remainder >= denominator)):
+            whole += 1
+        return str(whole).encode('ascii')
+
+    def size(self, line):
+        """The exact size in the first selected field of `line`, as an int or
+        a `Fraction` of bytes, or `None` if there isn't one
+        """
+        match = self.pattern.match(line)
+        field = match and match.group(self.positions[0] + 1)
+        if not field:
+            return None
+        try:
+            numerator, denominator = self.parse(field)
+        except ValueError:
+            return None
+        if numerator % denominator:
+            return Fraction(numerator, denominator)
+        return numerator // denominator
+
+
+class _Stop(Exception):
+    pass
+
+
+def _filter(converter, stream, stdout, stderr, path, args):
+    """Copy `stream` to `stdout`, converting as we go.
+
+    :return: the exit status, or `None` to abort
+    """
+    line_number = 0
+    for _ in range(args.header):
+        line = stream.readline()
+        stdout.write(line)
+        line_number += 1
+
+    stop_at_error = args.invalid == 'abort'
+    if args.jobs != 1 and path != '-' and _is_regular(stream):
+        results = _convert_parallel(converter, path, stream.tell(), args.jobs, stop_at_error)
+    else:
+        results = ((converter.block(block, stop_at_error), block.count(b'\n'))
+                   for block in _blocks(stream))
+
+    status = 0
+    for (output, errors), lines in results:
+        stdout.write(output)
+        for number, message in errors:
+            if args.invalid != 'ignore':
+                stderr.write("bytesize: {}:{}: {}\n".format(path, line_number + number + 1, message))
+            if args.invalid == 'abort':
+                results.close()
+                return None
+            if args.invalid == 'fail':
+                status = 2
+        line_number += lines
+    return status
+
+
+def _is_regular(stream):
+    try:
+        return stat.S_ISREG(os.fstat(stream.fileno()).st_mode)
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return False
+
+
+def _convert_parallel(converter, path, start, jobs, stop_at_error):
+    """Convert the file at `path` from offset `start`, in chunks of whole
+    lines in a pool of `jobs` processes. Each process maps the file into
+    memory, and converts the chunks it's assigned.
+
+    Results are generated in order. At most two per process are held at once.
+
+    :return: a generator of ``((output, errors), lines)`` for each chunk, as
+             for `_Converter.block`
+    """
+    with open(path, 'rb') as ff:
+        size = os.fstat(ff.fileno()).st_size
+        if size <= start:
+            return
+        mapped = mmap.mmap(ff.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        bounds = list(_chunk_bounds(mapped, start, size, _CHUNK_SIZE))
+    finally:
+        mapped.close()
+
+    jobs = jobs or multiprocessing.cpu_count()
+    pool = multiprocessing.Pool(jobs, initializer=_init_worker,
+                                initargs=(converter, path, stop_at_error))
+    try:
+        pending = collections.deque()
+        for chunk_start, chunk_end in bounds:
+            pending.append(pool.apply_async(_convert_chunk, (chunk_start, chunk_end)))
+            if len(pending) >= 2 * jobs:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _chunk_bounds(mapped, start, end, size):
+    """Split ``mapped[start:end]`` into chunks of whole lines of about `size`
+    bytes each
+
+    :return: a generator of ``(start, end)`` for each chunk
+    """
+    while start < end:
+        stop = mapped.find(b'\n', min(start + size, end) - 1, end)
+        stop = end if stop < 0 else stop + 1
+        yield start, stop
+        start = stop
+
+
+_worker = None
+
+
+def _init_worker(converter, path, stop_at_error):
+    global _worker
+    with open(path, 'rb') as ff:
+        mapped = mmap.mmap(ff.fileno(), 0, access=mmap.ACCESS_READ)
+    _worker = (converter, mapped, stop_at_error)
+
+
+def _convert_chunk(start, end):
+    converter, mapped, stop_at_error = _worker
+    data = mapped[start:end]
+    return converter.block(data, stop_at_error), data.count(b'\n')
+
+
+def _blocks(stream, size=_BLOCK_SIZE):
+    """Read `stream` in blocks of whole lines, of about `size` bytes each"""
+    rest = b''
+    while True:
+        data = stream.read(size)
+        if not data:
+            if rest:
+                yield rest
+            return
+        cut = data.rfind(b'\n') + 1
+        if not cut:
+            rest += data
+            continue
+        yield rest + data[:cut]
+        rest = data[cut:]
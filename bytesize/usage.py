@@ -0,0 +1,408 @@
+"""Measure the disk usage of directory trees, like ``du``.
+
+Directories are listed with :func:`os.scandir`, or before Python 3.5 with the
+scandir_ backport, by a pool of threads, so that many ``stat`` calls are in
+flight at once. That matters most on fast SSDs and on network filesystems,
+where each call is cheap to make but slow to return.
+Everything else, e.g. adding up totals and counting hard links once, is done
+by the calling thread.
+
+With a cache, the contents of each directory are saved in a SQLite database
+with its modification time, and later walks list only directories that
+changed since. The rest are only stat'ed.
+
+.. _scandir: https://pypi.org/project/scandir/
+"""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from builtins import *
+
+import json
+import multiprocessing
+import os
+import sqlite3
+import stat
+import sys
+import time
+from multiprocessing.pool import ThreadPool
+from queue import Queue
+
+try:
+    from os import scandir
+except ImportError:  # before Python 3.5, the `scandir` backport is imported when first needed
+    scandir = None
+
+if hasattr(os, 'fsencode'):
+    _fsencode, _fsdecode = os.fsencode, os.fsdecode
+else:  # Python 2
+    def _fsencode(path):
+        return path.encode(sys.getfilesystemencoding()) if isinstance(path, type('')) else path
+
+    def _fsdecode(path):
+        return path if isinstance(path, type('')) else path.decode(sys.getfilesystemencoding())
+
+from . import Quantity
+
+
+def disk_usage(path, apparent_size=False, one_file_system=False, threads=None, onerror=None,
+               cache=None):
+    """The total size of the file or directory tree at `path`, e.g.
+    ``disk_usage('docs')`` returns ``<Quantity 61440>``.
+
+    :param apparent_size: add up file sizes, ``st_size``, rather than the
+                          space allocated to files, ``st_blocks * 512``
+    :param one_file_system: skip directories on other filesystems than `path`
+    :param threads: the number of threads listing directories at once.
+                    Defaults to a few more than the number of CPUs
+    :param onerror: a function called with each `OSError` from listing a
+                    directory or reading a file's metadata, which then is
+                    skipped. By default errors are ignored, as in
+                    :func:`os.walk`.
+    :param cache: the filename of a SQLite database to save the contents of
+                  each directory in, with its modification time. Later walks
+                  with the same `cache` only stat the directories that haven't
+                  changed since, and list the others. It can be shared by
+                  walks of different trees.
+    :return: a :class:`Quantity`
+    :raises OSError: if `path` doesn't exist
+
+    Symbolic links are not followed, and each file with several hard links
+    is counted once.
+
+    A directory's modification time changes when files are added to it,
+    removed or renamed, but not when they're written, so with `cache` a file
+    that grows or shrinks in place isn't noticed until something else in its
+    directory changes.
+    """
+    walk = _Walk(path, apparent_size, one_file_system, threads, onerror, cache)
+    return Quantity(walk.totals[0])
+
+
+def walk_usage(path, apparent_size=False, one_file_system=False, threads=None, onerror=None,
+               cache=None, max_depth=None, seen=None):
+    """The total size of each directory in the tree at `path`, like ``du``::
+
+        for directory, size in walk_usage('docs'):
+            print("{:>8.4s} {}".format(size, directory))
+
+    prints::
+
+         4Ki docs/_static
+        12Ki docs/_templates
+        60Ki docs
+
+    :param max_depth: skip directories more than `max_depth` levels below
+                      `path`, though their sizes still count toward their
+                      parents'. E.g. ``max_depth=0`` yields only `path`
+    :param seen: a set of the ``(st_dev, st_ino)`` of files with several
+                 links counted already, e.g. by walks of other trees. They
+                 aren't counted again, and the ones counted here are added.
+                 Pass the same set to walk several trees as ``du`` does
+    :return: a generator of ``(directory, size)`` pairs, each directory after
+             those inside it and in order by name otherwise. If `path` isn't
+             a directory it's the only one.
+
+    The other arguments are as for :func:`disk_usage`.
+    """
+    walk = _Walk(path, apparent_size, one_file_system, threads, onerror, cache, seen)
+    for node in walk.postorder(max_depth):
+        yield walk.paths[node], Quantity(walk.totals[node])
+
+
+def _default_threads():
+    return min(32, multiprocessing.cpu_count() + 4)
+
+
+class _Walk(object):
+    """The directories in a tree, each with the total size of everything in
+    it.
+
+    Directories are numbered in the order they are found, so each one's
+    number is bigger than its parent's.
+    """
+
+    def __init__(self, path, apparent_size=False, one_file_system=False, threads=None,
+                 onerror=None, cache=None, seen=None):
+        self.apparent_size = apparent_size
+        self.onerror = onerror or (lambda error: None)
+        self.linked = {}  # (st_dev, st_ino) -> [(node, size)] of files with several links
+        self.seen = set() if seen is None else seen  # (st_dev, st_ino) of links counted
+        self.listed = {}  # node -> `os.stat_result` of directories listed to be cached
+
+        self.paths, self.parents, self.totals, self.depths = [], [], [], []
+        root = os.lstat(path)
+        self.device = root.st_dev if one_file_system else None
+        if not stat.S_ISDIR(root.st_mode):
+            node = self._add(path, None, 0)
+            if root.st_nlink > 1:
+                self._count(node, 0, [(root.st_dev, root.st_ino, self._size(root))])
+                self._count_links()
+            else:
+                self._count(node, self._size(root), [])
+            return
+
+        if scandir is None:
+            _import_scandir()
+        self.cache = cache and _UsageCache(cache, apparent_size)
+        results = Queue()
+        pool = ThreadPool(threads or _default_threads())
+        try:
+            self._schedule(pool, results, path, None, root)
+            pending = 1
+            while pending:
+                pending -= 1
+                node, listing = results.get()
+                if isinstance(listing, BaseException):
+                    raise listing
+                files, links, subdirs, complete = 0, [], [], True
+                for entry_path, entry_stat in listing:
+                    if isinstance(entry_stat, OSError):
+                        self.onerror(entry_stat)
+                        complete = False
+                    elif stat.S_ISDIR(entry_stat.st_mode):
+                        subdirs.append(entry_path)
+                        if self.device is None or entry_stat.st_dev == self.device:
+                            self._schedule(pool, results, entry_path, node, entry_stat)
+                            pending += 1
+                    elif entry_stat.st_nlink > 1:
+                        links.append((entry_stat.st_dev, entry_stat.st_ino,
+                                      self._size(entry_stat)))
+                    else:
+                        files += self._size(entry_stat)
+                self._count(node, files, links)
+                listed = self.listed.pop(node, None)
+                if listed is not None and complete:
+                    self.cache.put(self.paths[node], listed, files, links, subdirs)
+            if self.cache:
+                self.cache.save()
+        finally:
+            pool.terminate()
+            if self.cache:
+                self.cache.close()
+
+        self._count_links()
+        for node in range(len(self.paths) - 1, 0, -1):
+            self.totals[self.parents[node]] += self.totals[node]
+
+    def _add(self, path, parent, size):
+        self.paths.append(path)
+        self.parents.append(parent)
+        self.totals.append(size)
+        self.depths.append(0 if parent is None else self.depths[parent] + 1)
+        return len(self.paths) - 1
+
+    def _schedule(self, pool, results, path, parent, stat_result):
+        """List the directory at `path` in the pool, or if it's unchanged
+        since it was cached, count what's cached and only stat its
+        subdirectories
+        """
+        node = self._add(path, parent, self._size(stat_result))
+
+        def put(listing):
+            results.put((node, listing))
+        cached = self.cache and self.cache.get(path, stat_result)
+        if cached is None:
+            if self.cache:
+                self.listed[node] = stat_result
+            pool.apply_async(_catching, (_list, path), callback=put)
+        else:
+            files, links, subdirs = cached
+            self._count(node, files, links)
+            pool.apply_async(_catching, (_stat, subdirs), callback=put)
+
+    def _count(self, node, files, links):
+        """Add the sizes of files to the directory `node`.
+
+        :param files: the total size of files with one link
+        :param links: ``(st_dev, st_ino, size)`` of each file with several
+                      links, which are counted by `_count_links`
+        """
+        self.totals[node] += files
+        for device, inode, size in links:
+            self.linked.setdefault((device, inode), []).append((node, size))
+
+    def _count_links(self):
+        """Count each file with several links once, in the directory that
+        comes first in order by name, as ``du`` does, whichever directory was
+        listed first. Files in `seen` aren't counted again.
+        """
+        if not self.linked:
+            return
+        rank = {node: index for index, node in enumerate(self.preorder())}
+        for key, links in self.linked.items():
+            if key in self.seen:
+                continue
+            self.seen.add(key)
+            node, size = min(links, key=lambda link: rank[link[0]])
+            self.totals[node] += size
+
+    def _size(self, stat_result):
+        if self.apparent_size or not hasattr(stat_result, 'st_blocks'):  # e.g. on Windows
+            return stat_result.st_size
+        return stat_result.st_blocks * 512
+
+    def _children(self):
+        """The children of each directory in order by name, reversed"""
+        children = [[] for _ in self.paths]
+        for node in range(1, len(self.paths)):
+            children[self.parents[node]].append(node)
+        for nodes in children:
+            nodes.sort(key=self.paths.__getitem__, reverse=True)
+        return children
+
+    def preorder(self):
+        """The directories, each before its children, and the children of each
+        in order by name
+        """
+        children = self._children()
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(children[node])
+
+    def postorder(self, max_depth=None):
+        """The directories, each after its children, and the children of each
+        in order by name
+        """
+        children = self._children()
+        stack = [(0, False)]
+        while stack:
+            node, visited = stack.pop()
+            if visited:
+                yield node
+                continue
+            stack.append((node, True))
+            if max_depth is None or self.depths[node] < max_depth:
+                stack.extend((child, False) for child in children[node])
+
+
+class _UsageCache(object):
+    """The sizes of the files in each directory, saved in a SQLite database,
+    with the device, inode and modification time of the directory.
+
+    A directory modified in the last `racy_seconds` isn't saved, since it
+    could change again without its modification time changing.
+    """
+
+    racy_seconds = 2
+
+    def __init__(self, filename, apparent_size):
+        self.connection = sqlite3.connect(filename)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS directories ('
+            ' path BLOB, apparent INTEGER, device INTEGER, inode INTEGER, mtime INTEGER,'
+            ' files INTEGER, links TEXT, subdirs BLOB,'
+            ' PRIMARY KEY (path, apparent)) WITHOUT ROWID')
+        self.apparent = int(bool(apparent_size))
+        self.stale = {}  # key -> subdirectory names of changed directories
+        self.rows = []
+
+    @staticmethod
+    def _key(path):
+        return _fsencode(os.path.abspath(path))
+
+    @staticmethod
+    def _version(stat_result):
+        return (stat_result.st_dev, stat_result.st_ino, _mtime_ns(stat_result))
+
+    def get(self, path, stat_result):
+        """``(files, links, subdirs)`` for the directory at `path` as
+        passed to `put`, or `None` if it has changed or isn't cached
+        """
+        key = self._key(path)
+        row = self.connection.execute(
+            'SELECT device, inode, mtime, files, links, subdirs FROM directories '
+            'WHERE path = ? AND apparent = ?', (key, self.apparent)).fetchone()
+        if row is None:
+            return None
+        names = row[5].split(b'\0') if row[5] else []
+        if tuple(row[:3]) != self._version(stat_result):
+            self.stale[key] = names
+            return None
+        return (row[3], [tuple(link) for link in json.loads(row[4])],
+                [os.path.join(path, _fsdecode(name)) for name in names])
+
+    def put(self, path, stat_result, files, links, subdirs):
+        """Save the contents of the directory at `path`.
+
+        :param files: the total size of the files in it with one link
+        :param links: ``(st_dev, st_ino, size)`` of each file in it with
+                      several links
+        :param subdirs: the paths of the directories in it
+        """
+        key = self._key(path)
+        names = [_fsencode(os.path.basename(subdir)) for subdir in subdirs]
+        # forget the subtrees of directories that are gone
+        for name in set(self.stale.pop(key, ())) - set(names):
+            self._forget(os.path.join(key, name))
+        if _mtime_ns(stat_result) < (time.time() - self.racy_seconds) * 1e9:
+            self.rows.append((key, self.apparent) + self._version(stat_result) +
+                             (files, json.dumps(links), b'\0'.join(names)))
+
+    def _forget(self, key):
+        # the paths after `key` + '/' and before `key` + '0' are inside it
+        self.connection.execute(
+            'DELETE FROM directories WHERE path = ? OR (path > ? AND path < ?)',
+            (key, key + _fsencode(os.sep), key + _fsencode(chr(ord(os.sep) + 1))))
+
+    def save(self):
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO directories VALUES (?, ?, ?, ?, ?, ?, ?, ?)', self.rows)
+        self.connection.commit()
+        self.rows = []
+
+    def close(self):
+        self.connection.close()
+
+
+def _mtime_ns(stat_result):
+    try:
+        return stat_result.st_mtime_ns
+    except AttributeError:  # Python 2
+        return int(stat_result.st_mtime * 10**9)
+
+
+def _import_scandir():
+    global scandir
+    from scandir import scandir
+    return scandir
+
+
+def _catching(function, *args):
+    """``function(*args)``, or the exception it raises. Runs in a pool thread,
+    where ``apply_async`` has no `error_callback` on Python 2.
+    """
+    try:
+        return function(*args)
+    except BaseException as ee:
+        return ee
+
+
+def _stat(paths):
+    """The path and `os.stat_result` of each of `paths`, or the `OSError`
+    from reading it. Runs in a pool thread.
+    """
+    listing = []
+    for path in paths:
+        try:
+            listing.append((path, os.lstat(path)))
+        except OSError as ee:
+            listing.append((path, ee))
+    return listing
+
+
+def _list(path):
+    """The path and `os.stat_result` of each entry in the directory at `path`,
+    or the `OSError` from reading it instead. Runs in a pool thread.
+    """
+    listing = []
+    try:
+        for entry in scandir(path):
+            try:
+                listing.append((entry.path, entry.stat(follow_symlinks=False)))
+            except OSError as ee:
+                listing.append((entry.path, ee))
+    except OSError as ee:
+        listing.append((path, ee))
+    return listing
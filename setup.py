@@ -26,8 +26,15 @@ if __name__ == '__main__':
         name = 'bytesize',
         version = VERSION,
         packages = ['bytesize'],
+        install_requires = [
+            'scandir; python_version < "3.5"',  # for `disk_usage` and `walk_usage`
+        ],
         extras_require = {
-            'pint': 'pint>=0.6'
+            'pint': 'pint>=0.6',
+            'numpy': 'numpy',
+        },
+        entry_points = {
+            'console_scripts': ['bytesize = bytesize.cli:main_exit'],
         },
 
         # metadata for upload to PyPI
@@ -1,6 +1,9 @@
 # Don't import future. Real Python 2 users won't
 
 import operator
+import subprocess
+import sys
+import time
 
 from nose.tools import raises
 from future.utils import PY2
@@ -50,6 +53,57 @@ def test_arithmetic():
     assert type(Q(1) // Q(1)) == Q
 
 
+def test_arithmetic_values():
+    assert Q(3) + 4 == 7
+    assert 4 + Q(3) == 7
+    assert Q(7) - Q(3) == 4
+    assert 7 - Q(3) == 4
+    assert Q(3) * 4 == 12
+    assert 4 * Q(3) == 12
+    assert Q(7) // 2 == 3
+    assert 7 // Q(2) == 3
+    assert Q(2**70) * 2**70 == 2**140
+    assert Q(3) + 2.0 == 5 and type(Q(3) + 2.0) == Q
+    assert Q(3) + True == 4 and type(Q(3) + True) == Q
+
+
+def test_arithmetic_errors():
+    @raises(TypeError)
+    def check_type_error(function):
+        function()
+
+    for function in (lambda: Q(1) - 2, lambda: 1 - Q(2), lambda: Q(1) + -2, lambda: -2 + Q(1),
+                     lambda: Q(1) * -1, lambda: -1 * Q(1), lambda: Q(1) // -2, lambda: -2 // Q(1),
+                     lambda: Q(1) + 0.5, lambda: Q(1) * 0.5, lambda: Q(1) + 'a'):
+        yield check_type_error, function
+
+    @raises(ZeroDivisionError)
+    def check_zero_division(function):
+        function()
+
+    yield check_zero_division, lambda: Q(1) // 0
+    yield check_zero_division, lambda: 1 // Q(0)
+
+
+def test_hash():
+    assert hash(Q(1400605)) == hash(1400605)
+    assert {Q(1400605): 'a'}[1400605] == 'a'
+    assert {1400605: 'a'}[Q(1400605)] == 'a'
+    assert len(set([Q(1024), Q('1 KiB'), 1024, Q(1)])) == 2
+    assert not hasattr(Q(1400605), '__dict__')
+
+
+def test_interned():
+    for value in (0, 1, 256, 1024, 2**90, 10**27):
+        assert Q(value) is Q(value)
+    assert Q(1024) is Q('1 KiB') is Q(1024.0) is Q(Q(1024))
+    assert Q(1) + 1023 == Q(1024)
+
+    class Subclass(Q):
+        pass
+    assert type(Subclass(1024)) == Subclass
+
+
 def test_relations():
     assert Q(10) > Q(1)
     assert Q(10) >= Q(1)
@@ -117,18 +171,76 @@ def test_parsing():
         (u'1400605 B', '1.335 MiB'),
     ]
 
-    if bytesize._ureg:
-        def check_direct(b, result):
-            assert pp(b) == result
+    def check_direct(b, result):
+        assert pp(b) == result
+        if bytesize._ureg:
             assert pp(bytesize._ureg(b)) == result
-    else:
-        @raises(bytesize.NeedPintForParsingError)
-        def check_direct(b, result):
-            pp(b)
 
     for b, result in data:
         yield check_direct, b, result
 
+
+def test_native_parsing():
+    data = [
+        ('0 B', 0),
+        ('1 byte', 1),
+        ('2 bytes', 2),
+        ('16 bits', 2),
+        ('16 b', 2),
+        ('1 kb', 125),
+        ('1 kilobit', 125),
+        ('1.5 kB', 1500),
+        ('1.5 kilobytes', 1500),
+        ('.5 KiB', 512),
+        ('2. KiB', 2048),
+        ('2TiB', 2199023255552),
+        ('2 terabytes', 2000000000000),
+        ('1e3 B', 1000),
+        ('1.2e-1 kB', 120),
+        ('+3 yobibytes', 3 * 1024**8),
+        (' 12345678901234567890123456789 B\n', 12345678901234567890123456789),
+        ('1.000000000000000000000001 YB', 10**24 + 1),
+    ]
+
+    def check(string, value):
+        assert int(Q(string)) == value
+
+    for string, value in data:
+        yield check, string, value
+
+
+def test_native_parsing_errors():
+    @raises(TypeError)
+    def check_type_error(string):
+        Q(string)
+
+    for string in ('-1 B', '1.1 B', '1 b', '0.3 kb'):
+        yield check_type_error, string
+
+    if not bytesize._ureg:
+        @raises(bytesize.NeedPintForParsingError)
+        def check_needs_pint(string):
+            Q(string)
+
+        # bare prefixes like '2T' are only for `bytesize --from-human`
+        for string in ('1000', 'MiB', '1 XB', '1 KB', '1 + 2 B', '800 kilobits/sec * 5 days',
+                       '2T', '1.5Ki', '5 k'):
+            yield check_needs_pint, string
+
+
+def test_native_parsing_out_of_range():
+    @raises(ValueError)
+    def check_fails_fast(string):
+        t0 = time.time()
+        try:
+            Q(string)
+        finally:
+            assert time.time() - t0 < 1
+
+    for string in ('1e9999999 B', '1e-9999999 B', '1' * 1000 + ' B', '1.' + '0' * 1000 + ' KiB'):
+        yield check_fails_fast, string
+
+
 def test_format_type():
     data = [
         ('', 1, '1 B'),
@@ -308,6 +420,334 @@ def test_short_tolerance():
         yield check, tolerance, base, value, result
 
 
+def test_formatter_memoized():
+    assert bytesize.formatter() is bytesize.formatter(base=1024, cutoff=1000)
+    assert bytesize.formatter() is not bytesize.formatter(abbrev=False)
+    assert bytesize.short_formatter() is bytesize.short_formatter()
+    assert bytesize.short_formatter() is not bytesize.short_formatter(base=1024)
+
+    pp = bytesize.formatter(abbrev=False)
+    assert pp(Q(1400605)) == pp(1400605) == '1.335 mebibytes'
+    assert pp(1.0) == pp(True) == '1 byte'
+
+    # arguments are validated even when an equal key is memoized
+    @raises(ValueError)
+    def check_invalid(factory, kwargs):
+        factory(**kwargs)
+
+    bytesize.formatter()
+    bytesize.short_formatter(base=1000)
+    yield check_invalid, bytesize.formatter, {'digits': 5.0}
+    yield check_invalid, bytesize.formatter, {'digits': 4}
+    yield check_invalid, bytesize.short_formatter, {'tolerance': 2}
+
+
+def test_format_array():
+    assert bytesize.format_array([]) == []
+    assert (bytesize.format_array([1400605, '1 KiB', 1.0, Q(0)], abbrev=False) ==
+            ['1.335 mebibytes', '1 kibibyte', '1 byte', '0 bytes'])
+
+    @raises(TypeError)
+    def check(values):
+        bytesize.format_array(values)
+
+    yield check, [1, -1]
+    yield check, [1, 0.5]
+
+
+def test_short_format_array():
+    values = [1999999999999, 2000000000000, 2000000000001, 2999999999999, 1000, 1001, 1048577]
+
+    def check(tolerance, base):
+        fmt = bytesize.short_formatter(tolerance=tolerance, base=base)
+        assert (bytesize.short_format_array(values, tolerance=tolerance, base=base) ==
+                [fmt(value) for value in values])
+
+    for tolerance in (None, 0, 0.0, 0.01, 0.5, 1, 1.0):
+        yield check, tolerance, None
+    yield check, None, 1000
+    yield check, None, 1024
+
+
+def test_buffer_array():
+    import array
+    import io
+    import mmap
+    import struct
+    import tempfile
+    from bytesize import bulk
+
+    values = [1400605, 1024, 0, 2**64 - 1, 999]
+    records = b''.join(struct.pack('<QHxx', value, ii) for ii, value in enumerate(values))
+    expected = bytesize.format_array(values)
+
+    def check(numpy_, iter_unpack=True):
+        original, bulk._numpy = bulk._numpy, (lambda: None) if not numpy_ else bulk._numpy
+        original_iter_unpack, bulk._iter_unpack = bulk._iter_unpack, (
+            bulk._iter_unpack if iter_unpack else None)
+        try:
+            packed = struct.pack('<5Q', *values)
+            for buffer in (packed, bytearray(packed), memoryview(packed), array.array('Q', values)):
+                assert bytesize.format_array(bytesize.buffer_array(buffer)) == expected
+            assert bytesize.format_array(bytesize.buffer_array(records, stride=12)) == expected
+            assert list(bytesize.buffer_array(records, '<u2', offset=8, stride=12)) == list(range(5))
+            assert list(bytesize.buffer_array(struct.pack('>3i', 7, 8, 9), '>i4', count=2)) == [7, 8]
+            assert list(bytesize.buffer_array(records, stride=12)[::-2]) == [999, 0, 1400605]
+            assert (bytesize.short_format_array(bytesize.buffer_array(packed)) ==
+                    bytesize.short_format_array(values))
+
+            with tempfile.TemporaryFile() as ff:
+                ff.write(packed)
+                ff.flush()
+                mapped = mmap.mmap(ff.fileno(), 0, access=mmap.ACCESS_READ)
+                assert bytesize.format_array(bytesize.buffer_array(mapped, offset=8)) == expected[1:]
+                del mapped
+        finally:
+            bulk._numpy = original
+            bulk._iter_unpack = original_iter_unpack
+
+    yield check, True
+    yield check, False
+    yield check, False, False  # as on Python 2
+
+    @raises(ValueError)
+    def check_error(buffer, kwargs):
+        bytesize.buffer_array(buffer, **kwargs)
+
+    yield check_error, records, {'dtype': '<f8'}
+    yield check_error, records, {'stride': 4}
+    yield check_error, records, {'stride': 12, 'count': 6}
+    yield check_error, records, {'offset': -1}
+
+
+def test_format_array_out():
+    import io
+    import tempfile
+    from bytesize import bulk
+
+    values = [1400605, 1024, 0, 2**70, 999] * 3
+    expected = ''.join(line + '\n' for line in bytesize.format_array(values))
+    short_expected = ''.join(line + '\n' for line in bytesize.short_format_array(values))
+
+    chunk_size, bulk._WRITE_CHUNK_SIZE = bulk._WRITE_CHUNK_SIZE, 4
+    try:
+        out = io.StringIO()
+        assert bytesize.format_array(values, out=out) == len(values)
+        assert out.getvalue() == expected
+        out = io.BytesIO()
+        assert bytesize.short_format_array(iter(values), out=out) == len(values)
+        assert out.getvalue() == short_expected.encode()
+        with tempfile.TemporaryFile() as ff:
+            bytesize.format_array(values, out=ff)
+            ff.seek(0)
+            assert ff.read() == expected.encode()
+        with tempfile.TemporaryFile('w+') as ff:
+            bytesize.format_array(values, out=ff)
+            ff.seek(0)
+            assert ff.read() == expected
+        assert bytesize.format_array([], out=out) == 0
+    finally:
+        bulk._WRITE_CHUNK_SIZE = chunk_size
+
+
+def test_write_humanized():
+    import io
+    from bytesize import bulk
+    numpy = bulk._numpy()
+
+    all_values = [0, 1, 999, 1000, 1023, 1024, 1400605, 2000398934016, 2**64 - 1, 2**70]
+
+    def check(spec, make, values=all_values, numpy_=True):
+        expected = ''.join('{:{}}\n'.format(Q(value), spec) for value in values)
+        original, bulk._numpy = bulk._numpy, (lambda: None) if not numpy_ else bulk._numpy
+        try:
+            out = io.StringIO()
+            assert bytesize.write_humanized(out, make(values), spec) == len(values)
+            assert out.getvalue() == expected
+            out = io.BytesIO()
+            bytesize.write_humanized(out, make(values), spec, sep='\r\n')
+            assert out.getvalue() == expected.replace('\n', '\r\n').encode('utf-8')
+        finally:
+            bulk._numpy = original
+
+    chunk_size, bulk._WRITE_CHUNK_SIZE = bulk._WRITE_CHUNK_SIZE, 3
+    try:
+        for spec in ('', 'd', 'i', 'a', '.6', '>12.8d', '<12', '^13', '*=12', '=10s', 's', 'si', 'l',
+                     '_<30.10li', '\u2022^14.6i', '\u2022=8s', '.30d', '3'):
+            yield check, spec, list
+            yield check, spec, list, all_values, False
+        yield check, '=10', iter
+        yield check, '=10', bytesize.QuantityArray
+        if numpy is not None:
+            yield check, '=10', lambda values: numpy.array(values, dtype=object)
+            yield check, '=10', lambda values: numpy.array(values, dtype=numpy.uint64), all_values[:-1]
+    finally:
+        bulk._WRITE_CHUNK_SIZE = chunk_size
+
+    @raises(TypeError)
+    def check_error(values):
+        bytesize.write_humanized(io.StringIO(), values, 'd')
+
+    yield check_error, [1, -1]
+    if numpy is not None:
+        yield check_error, numpy.array([1, -1])
+
+    @raises(ValueError)
+    def check_spec():
+        bytesize.write_humanized(io.StringIO(), [1], 'z')
+
+    yield check_spec,
+
+
+def test_format_column():
+    values = [0, 1, 999, 1000, 1023, 1024, 1400605, 2000398934016, 2**64 - 1, 2**70]
+
+    def check(spec, fill_align):
+        column = bytesize.format_column(values, fill_align + spec)
+        assert len(set(map(len, column))) == 1
+        # the same as formatting with the width of the widest value
+        width = max(len('{:{}}'.format(Q(value), spec)) for value in values)
+        if fill_align in ('', '='):
+            # with units as wide as the widest possible
+            assert column == ['{:={}{}}'.format(Q(value), width, spec) for value in values]
+        else:
+            assert column == ['{:{}{}{}}'.format(Q(value), fill_align, width, spec)
+                              for value in values]
+
+    for spec in ('i', 'li', '.8i', 'si'):
+        for fill_align in ('', '=', '<', '_>', '^', '{^', '}<'):
+            yield check, spec, fill_align
+
+    assert bytesize.format_column([]) == []
+    assert bytesize.format_column(iter([1024, 1])) == ['1 KiB', '1 B  ']
+    assert bytesize.format_column([1024, 10**6], 'd') == ['1.024 kB', '    1 MB']
+    assert bytesize.format_column([1, 10**7], '*=d') == ['*1 B*', '10 MB']
+
+    @raises(ValueError)
+    def check_error(spec):
+        bytesize.format_column(values, spec)
+
+    yield check_error, '10'
+    yield check_error, '=10i'
+    yield check_error, 'z'
+
+
+def test_aggregate():
+    values = [7, 2**70, Q(1024), 0, '1 KiB'] * 3000  # more than one chunk
+    ints = [int(Q(value)) for value in values]
+
+    def check(values_type):
+        assert type(bytesize.total(values_type(values))) == Q
+        assert bytesize.total(values_type(values)) == sum(ints)
+        assert bytesize.count(values_type(values)) == len(ints)
+        assert bytesize.minimum(values_type(values)) == 0
+        assert bytesize.maximum(values_type(values)) == 2**70
+        assert bytesize.mean(values_type(values)) == sum(ints) // len(ints)
+
+    yield check, list
+    yield check, tuple
+    yield check, iter
+
+    summary = bytesize.summarize(values[:5]).merge(bytesize.summarize([]), bytesize.summarize(values[5:]))
+    assert summary == bytesize.summarize(iter(values))
+    assert summary.mean == bytesize.mean(values)
+
+    empty = bytesize.summarize([])
+    assert empty == (0, 0, None, None)
+    assert empty.mean is None
+    assert bytesize.total([]) == 0
+
+    try:
+        import numpy
+    except ImportError:
+        return
+    small = [value for value in ints if value < 2**63]
+    for array in (numpy.array(small, dtype=numpy.int64), numpy.array(small, dtype=numpy.uint64),
+                  numpy.arange(100, dtype=numpy.int8)):
+        expected = array.tolist()
+        assert bytesize.summarize(array) == bytesize.summarize(expected)
+        assert type(bytesize.total(array)) == Q
+        assert bytesize.mean(array.reshape(2, -1)) == bytesize.mean(expected)
+
+
+def test_aggregate_errors():
+    @raises(TypeError)
+    def check(values):
+        bytesize.total(values)
+
+    yield check, [1, -1]
+    yield check, [1, 0.5]
+    yield check, [1] * 5000 + [-1]
+    yield check, [1, None]
+
+    try:
+        import numpy
+    except ImportError:
+        return
+    yield check, numpy.array([1, -1])
+
+
+def test_quantity_array():
+    from bytesize import arrays
+
+    values = [1400605, 1024, 0, 2**64 - 1, 1024, 5]
+
+    def check(numpy_, extra):
+        original, arrays._numpy = arrays._numpy, (lambda: None) if not numpy_ else arrays._numpy
+        try:
+            ints = values + extra
+            qa = bytesize.QuantityArray(ints)
+            assert len(qa) == len(ints) and qa.tolist() == ints
+            assert list(qa) == ints and all(type(value) == Q for value in qa)
+            assert qa[0] == 1400605 and type(qa[-1]) == Q
+            assert qa[1:3] == bytesize.QuantityArray([1024, 0])
+            assert qa.sum() == sum(ints) and type(qa.sum()) == Q
+            assert qa.format('>10.6d') == ['{:>10.6d}'.format(Q(value)) for value in ints]
+
+            assert list(qa.argsort()) == sorted(range(len(ints)), key=ints.__getitem__)
+            assert list(qa.argsort(reverse=True)) == sorted(range(len(ints)), key=ints.__getitem__,
+                                                            reverse=True)
+            assert qa.take(qa.argsort()).tolist() == sorted(ints)
+            copy = qa[:]
+            copy.sort(reverse=True)
+            assert copy.tolist() == sorted(ints, reverse=True) and qa.tolist() == ints
+
+            assert (qa + 1).tolist() == [value + 1 for value in ints]
+            assert (Q(2) * qa).tolist() == [value * 2 for value in ints]
+            assert (qa // 1024).tolist() == [value // 1024 for value in ints]
+            assert (2**70 - qa).tolist() == [2**70 - value for value in ints]
+            assert (qa - 0) == qa and bytesize.QuantityArray(qa) == qa
+            assert bytesize.QuantityArray() == bytesize.QuantityArray([]) and not len(qa[:0])
+        finally:
+            arrays._numpy = original
+
+    for numpy_ in (True, False):
+        yield check, numpy_, []
+        yield check, numpy_, [2**70]
+
+
+def test_quantity_array_errors():
+    qa = bytesize.QuantityArray([0, 1024])
+
+    @raises(TypeError)
+    def check(function):
+        function()
+
+    yield check, lambda: bytesize.QuantityArray([1, -1])
+    yield check, lambda: bytesize.QuantityArray([0.5])
+    yield check, lambda: qa - 1
+    yield check, lambda: 1000 - qa
+    yield check, lambda: qa + 0.5
+    yield check, lambda: qa / 2
+
+    @raises(ZeroDivisionError)
+    def check_zero(function):
+        function()
+
+    yield check_zero, lambda: qa // 0
+    yield check_zero, lambda: 1 // qa
+
+
 def test_formatter_value_errors():
     @raises(ValueError)
     def check_long(kwargs):
@@ -333,6 +773,26 @@ def test_formatter_value_errors():
     yield check_short, {'base': 1984}
 
 
+def test_lazy_pint():
+    # formatting and native parsing shouldn't import pint
+    code = ("import sys, bytesize; "
+            "bytesize.formatter()(1400605); '{:a}'.format(bytesize.Quantity('200 MiB')); "
+            "assert 'pint' not in sys.modules")
+    subprocess.check_call([sys.executable, '-c', code])
+
+
+def test_lazy_registry_attributes():
+    import copy
+    assert not hasattr(bytesize._ureg, '__wrapped__')
+    assert not hasattr(bytesize._ureg, '_no_such_attribute')
+    assert bool(copy.copy(bytesize._ureg)) == bool(bytesize._ureg)
+    if not bytesize._ureg:
+        assert not hasattr(bytesize._ureg, 'Quantity')
+    assert not hasattr(bytesize._LazyModule(), '__wrapped__')
+    if bytesize._ureg:
+        assert bytesize._LazyModule().UnitRegistry is bytesize._import_pint().UnitRegistry
+
+
 if bytesize._ureg:
     def test_other_registry():
         other_ureg = bytesize.pint.UnitRegistry()
@@ -346,6 +806,107 @@ if bytesize._ureg:
         bytesize.formatter()(q)
 
 
+def test_spec_cache():
+    bytesize.spec_cache_clear()
+    assert '{:>10.6d}'.format(Q(1)) == '       1 B'
+    assert '{:>10.6d}'.format(Q(1400605)) == ' 1.4006 MB'
+    assert '{:>10.6d}'.format(Q(2000398934016)) == ' 2.0003 TB'
+    info = bytesize.spec_cache_info()
+    assert (info.hits, info.misses, info.currsize) == (2, 1, 1)
+
+    cache = bytesize._FormatPlanCache(maxsize=2)
+    for spec in ('', 'd', 'i', 'd'):
+        cache.compile(spec)
+    assert sorted(cache.plans) == ['d', 'i']
+    assert cache.info().misses == 4
+
+
+def test_spec_cache_threads():
+    import threading
+
+    def work():
+        for value in range(0, 10**6, 97):
+            '{:>10.6d}'.format(Q(value))
+
+    bytesize.spec_cache_clear()
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    info = bytesize.spec_cache_info()
+    assert info.hits + info.misses == 4 * len(range(0, 10**6, 97))
+
+
+def test_result_cache():
+    fmt = bytesize.formatter(base=1000)
+    uncached = bytesize.formatter(base=1000, cache=False)
+    bytesize.result_cache_clear()
+    bytesize.enable_result_cache(maxsize=3)
+    try:
+        assert '{:d}'.format(Q(1400605)) == '1.400 MB'
+        assert '{:d}'.format(Q(1400605)) == '1.400 MB'
+        assert fmt(1400605) == fmt(Q(1400605)) == '1.400 MB'
+        assert Q(1400605).humanize() == Q(1400605).humanize() == ('1.335', 'MiB')
+        info = bytesize.result_cache_info()
+        assert (info.hits, info.misses, info.evictions, info.currsize) == (3, 3, 0, 3)
+
+        assert Q(1400605).short_humanize() == ('1.33', 'Mi')
+        assert bytesize.short_formatter()(2000398934016) == '2T'
+        info = bytesize.result_cache_info()
+        assert (info.hits, info.misses, info.evictions, info.currsize) == (3, 5, 2, 3)
+
+        # bypassed
+        assert uncached(1400605) == '1.400 MB'
+        assert Q(1400605).humanize(cache=False) == ('1.335', 'MiB')
+        with bytesize.result_cache_disabled():
+            assert '{:d}'.format(Q(1400605)) == '1.400 MB'
+            assert fmt(1400605) == '1.400 MB'
+        assert bytesize.result_cache_info()[:3] == (3, 5, 2)
+
+        # errors aren't cached
+        for _ in range(2):
+            try:
+                fmt(-1)
+            except TypeError:
+                pass
+            else:
+                assert False
+    finally:
+        bytesize.disable_result_cache()
+        bytesize.result_cache_clear()
+
+    assert '{:d}'.format(Q(1400605)) == '1.400 MB'
+    assert bytesize.result_cache_info() == (0, 0, 0, 0, 0)
+
+
+def test_result_cache_threads():
+    import threading
+    values = [3**exp for exp in range(50)] + list(range(0, 10**6, 9973))
+    expected = [Q(value).humanize() for value in values]
+    failures = []
+
+    def work():
+        for value, string in zip(values, expected):
+            if Q(value).humanize() != string:
+                failures.append(value)
+
+    bytesize.enable_result_cache(maxsize=50)
+    try:
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        info = bytesize.result_cache_info()
+        assert info.currsize == 50
+        assert info.hits + info.misses == 4 * len(values)
+    finally:
+        bytesize.disable_result_cache()
+        bytesize.result_cache_clear()
+    assert not failures
+
+
 @raises(ValueError)
 def test_format_unknown_code():
     '{:z}'.format(Q(10000))
@@ -371,9 +932,14 @@ def test_way_too_big():
     print(Q(100000000000000000000000000000))
 
 
+@raises(bytesize.UnitNoExistError)
+def test_decompose_way_too_big():
+    Q(100000000000000000000000000000).decompose()
+
+
 PARSE_SPEC_CASES = [
     (fill, align, width, precision, type_)
-    for fill in (None, ' ', '0')
+    for fill in (None, ' ', '0', '{', '}')
     for align in (None, '>', '<', '=', '^')
     for width in (None, 6, 10, 15)
     for precision in (None, 5, 6, 7, 8, 9, 10, 11)
@@ -396,7 +962,7 @@ def test_parse_spec():
         print("\n{:13} {}".format(format_str, flo))
 
         for value in values:
-            byt = format_str.format(value)
+            byt = format(value, spec)
 
             if align is not None and width is not None:
                 if precision is None and width >= 9:
@@ -404,6 +970,12 @@ def test_parse_spec():
                 else:
                     assert len(byt) >= width
 
+            if align not in (None, '='):
+                # padded as `str.format` pads, whatever the fill character
+                bare = format(value, Q.unparse_spec(None, None, None, precision, type_))
+                padding = (fill or '') + align + (str(width) if width is not None else '')
+                assert byt == format(bare, padding)
+
             print("{:13} {!r}".format('', byt))
 
     values = [Q(k) for k in (1, 999, 1023, 102526)]
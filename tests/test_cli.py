@@ -0,0 +1,214 @@
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from builtins import *
+
+import io
+import os
+import subprocess
+import sys
+import tempfile
+
+from nose.tools import raises
+
+from bytesize import cli
+
+
+def run(argv, data):
+    """Run the command with `data` on stdin, and return ``(status, stdout,
+    stderr)``
+    """
+    stdout, stderr = io.BytesIO(), io.StringIO()
+    status = cli.main(argv, stdin=io.BytesIO(data), stdout=stdout, stderr=stderr)
+    return status, stdout.getvalue(), stderr.getvalue()
+
+
+def test_whitespace():
+    data = b'4096 ./a\n  1400605\t./b c\n\n2000398934016\r\n5'
+    assert run([], data) == (0, b'4 KiB ./a\n  1.335 MiB\t./b c\n\n1.819 TiB\r\n5 B', '')
+    assert run(['--format', '>10.6d'], data)[1] == (
+        b'  4.096 kB ./a\n   1.4006 MB\t./b c\n\n 2.0003 TB\r\n       5 B')
+
+
+def test_fields():
+    def check(argv, data, expected):
+        assert run(argv, data) == (0, expected, '')
+
+    yield check, ['-f', '2', '--format', 's'], b'a 1024 2048\n', b'a 1Ki 2048\n'
+    yield check, ['-f', '1,3', '--format', 's'], b'1024 b 2048 4096\n', b'1Ki b 2Ki 4096\n'
+    yield check, ['-f', '2-3', '--format', 's'], b'a 1024 2048 c\n', b'a 1Ki 2Ki c\n'
+    yield check, ['-f', '2-', '--format', 's'], b'a 1024 2048 4096\n', b'a 1Ki 2Ki 4Ki\n'
+    yield check, ['-f', '2-', '--format', 's'], b' \ta\t 1024 2048\n', b' \ta\t 1Ki 2Ki\n'
+    yield check, ['-f', '3', '--format', 's'], b'1024 2048\n1\n', b'1024 2048\n1\n'
+
+
+def test_delimiter():
+    def check(argv, data, expected):
+        assert run(argv, data) == (0, expected, '')
+
+    yield check, ['-d', ',', '-f', '2', '--format', 's'], b'a,1024,c\r\nb,,d\n', b'a,1Ki,c\r\nb,,d\n'
+    yield check, ['-d', '\\t', '-f', '1-', '--format', 's'], b'1024\t2048\r\n', b'1Ki\t2Ki\r\n'
+    yield check, ['-d', ',', '-f', '2', '--header', '1'], b'n,size\na,1024\n', b'n,size\na,1 KiB\n'
+
+
+def test_invalid():
+    data = b'1 a\nbad b\n2 c\n'
+    assert run([], data) == (2, b'1 B a\nbad b\n2 B c\n', "bytesize: -:2: invalid number: 'bad'\n")
+    assert run(['--invalid', 'warn'], data)[0] == 0
+    assert run(['--invalid', 'ignore'], data) == (0, b'1 B a\nbad b\n2 B c\n', '')
+    assert run(['--invalid', 'abort'], data) == (2, b'1 B a\n', "bytesize: -:2: invalid number: 'bad'\n")
+    assert run([], b'-1\n1.5\n' + str(10**30).encode() + b'\n')[2].count('\n') == 3
+
+
+def test_from_human():
+    def check(argv, data, expected):
+        assert run(argv, data) == (0, expected, '')
+
+    yield check, ['--from-human'], b'1.335 MiB x\n2T\n10 kilobytes\n1.33Mi\n999B\n7\n', (
+        b'1399849 x\n2000000000000\n10000\n1394607\n999\n7\n')
+    yield check, ['--from-human', '-f', '2'], b'a 1024 f.txt\nb 5 k c\n', b'a 1024 f.txt\nb 5000 c\n'
+    yield check, ['--from-human', '-f', '2-', '--round', 'down'], b'a 1.5 B  1.5 KiB\r\n', (
+        b'a 1  1536\r\n')
+    yield check, ['--from-human', '-f', '1,3', '--round', 'nearest'], b'1.5 B x 1.4 B\n', b'2 x 1\n'
+    yield check, ['--from-human', '-d', ',', '-f', '2-'], b'x,1.5 KiB,2 K\n', b'x,1536,2000\n'
+    yield check, ['--from-human', '--iec', '-f', '2-4'], b'/dev/sda1 20G 5.1G 14K 27% /\n', (
+        b'/dev/sda1 21474836480 5476083303 14336 27% /\n')
+
+
+def test_from_human_round_trip():
+    values = [0, 1, 999, 1000, 1023, 1024, 1400605, 2000398934016, 2**64 + 1]
+    data = b''.join(('%d\n' % value).encode() for value in values)
+    for spec in ('d', 'i', '.10i', 'l', 'sd', 'si'):
+        status, humanized, _ = run(['--format', spec], data)
+        assert status == 0
+        status, output, _ = run(['--from-human', '--round', 'down'], humanized)
+        assert status == 0
+        for value, parsed in zip(values, output.split()):
+            # formatting truncates to a few significant digits
+            assert value * 0.99 <= int(parsed) <= value
+
+
+def test_from_human_invalid():
+    data = b'1 KiB\nbogus\n-1 KiB\n1 XB\n2 KiB\n'
+    status, output, errors = run(['--from-human'], data)
+    assert status == 2
+    assert output == b'1024\nbogus\n-1 KiB\n1 XB\n2048\n'
+    assert errors.count('invalid size') == 2  # '1 XB' is 1 followed by something else
+
+
+def test_jobs():
+    data = b''.join(('%d x\n' % (ii * 7919)).encode() for ii in range(2000)) + b'bad\n1024'
+    expected = run(['--format', 'd', '--header', '2'], data)
+
+    with tempfile.NamedTemporaryFile() as ff:
+        ff.write(data)
+        ff.flush()
+
+        chunk_size, cli._CHUNK_SIZE = cli._CHUNK_SIZE, 1000
+        try:
+            for jobs in ('0', '1', '3'):
+                assert run(['--format', 'd', '--header', '2', '-j', jobs, ff.name], b'') == (
+                    expected[0], expected[1], expected[2].replace('-:', ff.name + ':'))
+            status, output, errors = run(['--invalid', 'abort', '-j', '2', ff.name], b'')
+            assert status == 2
+            assert output.count(b'\n') == 2000
+            assert errors == "bytesize: {}:2001: invalid number: 'bad'\n".format(ff.name)
+        finally:
+            cli._CHUNK_SIZE = chunk_size
+
+
+def test_unreadable_file():
+    missing = os.path.join(tempfile.mkdtemp(), 'missing')
+    with tempfile.NamedTemporaryFile() as ff:
+        ff.write(b'1024\n')
+        ff.flush()
+        assert run([missing, ff.name, '-'], b'2048\n') == (
+            1, b'1 KiB\n2 KiB\n', "bytesize: {}: No such file or directory\n".format(missing))
+        assert run(['--invalid', 'warn', missing, '-'], b'x\n')[0] == 1
+        assert run([missing, '-'], b'x\n')[0] == 2
+        assert run(['sort', missing, ff.name, '-'], b'2 KiB\n') == (
+            1, b'1024\n2 KiB\n', "bytesize sort: {}: No such file or directory\n".format(missing))
+    os.rmdir(os.path.dirname(missing))
+
+
+def test_bad_arguments():
+    @raises(SystemExit)
+    def check(argv):
+        run(argv, b'')
+
+    for argv in (['-f', '0'], ['-f', 'x'], ['-f', '3-2'], ['-d', ',,'], ['--format', 'z'],
+                 ['--from-human', '--format', 'd'], ['--iec'], ['-j', '-1']):
+        yield check, argv
+
+
+def test_sort():
+    data = b'1.5 KiB a\n2T b\n1 B c\nfoo d\n10 kilobytes e\n1.33Mi f\n1536 g\n1537 h\n1535 i\n1 j'
+    expected = b'foo d\n1 B c\n1 j\n1535 i\n1.5 KiB a\n1536 g\n1537 h\n10 kilobytes e\n1.33Mi f\n2T b\n'
+    assert run(['sort'], data) == (0, expected, '')
+
+    # lines with equal sizes keep their order when reversed too
+    reverse = b'2T b\n1.33Mi f\n10 kilobytes e\n1537 h\n1.5 KiB a\n1536 g\n1535 i\n1 B c\n1 j\nfoo d\n'
+    assert run(['sort', '-r'], data) == (0, reverse, '')
+
+    assert run(['sort', '-k', '2', '-d', ','], b'a,2K\nb,3 MiB\nc,\nd,1.5K\n')[1] == (
+        b'c,\nd,1.5K\na,2K\nb,3 MiB\n')
+    assert run(['sort', '--iec'], b'1.01K\n1024\n')[1] == b'1024\n1.01K\n'
+    assert run(['sort'], b'1024\n1.01K\n')[1] == b'1.01K\n1024\n'
+    assert run(['sort'], b'') == (0, b'', '')
+    # a bare '\r' is part of its line
+    assert run(['sort'], b'5 KiB a\rb\n1 KiB c\r\n\x0c2 d') == (
+        0, b'\x0c2 d\n1 KiB c\r\n5 KiB a\rb\n', '')
+
+
+def test_sort_external():
+    values = [(ii * 7919) % 5003 for ii in range(5003)]
+    data = b''.join(('%d B %d\n' % (value // 3, ii)).encode() for ii, value in enumerate(values))
+    expected = run(['sort'], data)[1]
+    assert expected.splitlines() == sorted(data.splitlines(), key=lambda line: int(line.split()[0]))
+
+    tmp = tempfile.mkdtemp()
+    fan_in, cli._MERGE_FAN_IN = cli._MERGE_FAN_IN, 4
+    min_budget, cli._MIN_BUDGET = cli._MIN_BUDGET, 0
+    try:
+        for argv in (['-S', '2000'], ['-S', '20 KiB'], ['-S', '100K', '-T', tmp]):
+            assert run(['sort'] + argv, data) == (0, expected, '')
+        assert run(['sort', '-r', '-S', '2000'], data)[1] == run(['sort', '-r'], data)[1]
+        assert os.listdir(tmp) == []
+    finally:
+        cli._MERGE_FAN_IN = fan_in
+        cli._MIN_BUDGET = min_budget
+        os.rmdir(tmp)
+
+    # a tiny buffer is raised to the minimum, rather than making a run a line
+    runs = []
+
+    def write_run(run, workdir):
+        runs.append(run)
+        return write_run.original(run, workdir)
+
+    write_run.original, cli._write_run = cli._write_run, write_run
+    try:
+        assert run(['sort', '-S', '1'], data) == (0, expected, '')
+        assert 0 < len(runs) < 10
+    finally:
+        cli._write_run = write_run.original
+
+
+def test_sort_bad_arguments():
+    @raises(SystemExit)
+    def check(argv):
+        run(['sort'] + argv, b'')
+
+    for argv in (['-k', '0'], ['-S', 'lots'], ['-S', '-1'], ['-S', '0'], ['-d', ',,']):
+        yield check, argv
+
+
+def test_blocks():
+    data = b''.join(('%d %s\n' % (ii, 'x' * ii)).encode() for ii in range(300)) + b'no newline'
+    blocks = list(cli._blocks(io.BytesIO(data), size=64))
+    assert b''.join(blocks) == data
+    assert all(block.endswith(b'\n') for block in blocks[:-1])
+
+
+def test_main_module():
+    output = subprocess.check_output([sys.executable, '-m', 'bytesize', '--format', 'd'],
+                                     input=b'1400605\n')
+    assert output == b'1.400 MB\n'
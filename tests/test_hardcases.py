@@ -5,6 +5,7 @@ from builtins import *
 
 import sys
 import re
+from fractions import Fraction
 from nose.tools import raises
 
 import bytesize
@@ -77,6 +78,133 @@ def test_hardcases():
                 yield raises(type(result))(fmt), b
 
 
+def test_reference_division():
+    """The `int` engine agrees with the `Fraction`-based reference engine"""
+    def check_reference(b, kwargs):
+        fmt = mk_formatter(_catch=True, **kwargs)
+        result = fmt(b)
+
+        bytesize._division = bytesize._Quotient.division
+        try:
+            reference = fmt(b)
+        finally:
+            bytesize._division = bytesize._IntQuotient.division
+
+        assert repr(result) == repr(reference)
+
+    for b, results in hardcases:
+        for kwargs in kwargses:
+            yield check_reference, b, kwargs
+            yield check_reference, b + b // 7, kwargs
+
+
+def test_decompose():
+    """`Quantity.decompose` has the numbers `formatter` shows, with either
+    engine
+    """
+    def check_decompose(b, result, kwargs, division):
+        bytesize._division = division
+        try:
+            dd = bytesize.Quantity(b).decompose(base=kwargs['base'], cutoff=kwargs['cutoff'])
+        finally:
+            bytesize._division = bytesize._IntQuotient.division
+
+        assert dd.base == kwargs['base']
+        number, units = result.split(' ')
+        assert dd.number == number
+        assert dd.units == units
+        qq, _ = bytesize._Quotient.division(b, base=dd.base, cutoff=kwargs['cutoff'])
+        assert dd.whole == qq.whole_part
+        assert dd.exact == (qq == dd.whole + Fraction(dd.fraction, 10**dd.fraction_digits))
+
+    for b, results in hardcases:
+        for result, kwargs in zip(results, kwargses):
+            if kwargs['_short'] or not kwargs['abbrev'] or isinstance(result, Exception):
+                continue
+            for division in (bytesize._IntQuotient.division, bytesize._Quotient.division):
+                yield check_decompose, b, result, kwargs, division
+
+
+def test_reference_decompose():
+    """Both engines decompose quotients as `_Quotient.decimalize` shows them"""
+    def check_reference_decompose(b, base, cutoff, digits):
+        qq, exp = bytesize._Quotient.division(b, base=base, cutoff=cutoff)
+        if exp >= len(bytesize.UNITS_TABLE[base]):
+            return  # see `test_exponent_thresholds`
+        int_qq, int_exp = bytesize._IntQuotient.division(b, base=base, cutoff=cutoff)
+        assert int_exp == exp
+        assert int_qq.decompose(digits) == qq.decompose(digits)
+        assert bytesize._number(*qq.decompose(digits)) == qq.decimalize(digits)
+
+    for b, _ in hardcases:
+        for base, cutoff in ((1024, 1000), (1024, 1024), (1000, 1000)):
+            for digits in (5, 6, 8):
+                yield check_reference_decompose, b, base, cutoff, digits
+                yield check_reference_decompose, b + b // 7, base, cutoff, digits
+
+
+def test_format_array():
+    def check_format_array(values, results, kwargs):
+        if kwargs['_short']:
+            format_array = bytesize.short_format_array
+        else:
+            format_array = bytesize.format_array
+        kwargs = dict((kk, vv) for kk, vv in kwargs.items() if kk != '_short')
+        assert format_array(values, **kwargs) == results
+
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+
+    for index, kwargs in enumerate(kwargses):
+        cases = [(b, results[index]) for b, results in hardcases
+                 if not isinstance(results[index], Exception)]
+
+        yield check_format_array, [b for b, _ in cases], [rr for _, rr in cases], kwargs
+        if numpy is not None:
+            small = [(b, rr) for b, rr in cases if b < 2**64]
+            yield (check_format_array, numpy.array([b for b, _ in small], dtype=numpy.uint64),
+                   [rr for _, rr in small], kwargs)
+            yield (check_format_array, numpy.array([b for b, _ in cases], dtype=object),
+                   [rr for _, rr in cases], kwargs)
+
+
+def test_automatic_base():
+    """'a' formats like whichever of 'd' or 'i' `guess_base` picks"""
+    def check_automatic(b, spec):
+        q = bytesize.Quantity(b)
+        explicit = spec + ('d' if q.guess_base() == 1000 else 'i')
+        automatic = catch(('{:' + spec + 'a}').format)(q)
+        assert repr(automatic) == repr(catch(('{:' + explicit + '}').format)(q))
+
+    for b, _ in hardcases:
+        for spec in ('', 'l', '.6', '12'):
+            yield check_automatic, b, spec
+
+
+def test_exponent_thresholds():
+    """Exponent tables agree with the reference engine on either side of each
+    unit boundary, and run out exactly where the units do
+    """
+    def check_threshold(b, base, cutoff):
+        qq, exp = bytesize._Quotient.division(b, base=base, cutoff=cutoff)
+        if exp < len(bytesize.UNITS_TABLE[base]):
+            int_qq, int_exp = bytesize._IntQuotient.division(b, base=base, cutoff=cutoff)
+            assert int_exp == exp
+            assert int_qq.whole_part == qq.whole_part
+            assert int_qq.exact == qq.exact
+        else:
+            raises(bytesize.UnitNoExistError)(bytesize._IntQuotient.division)(
+                b, base=base, cutoff=cutoff)
+
+    for base, cutoff in ((1024, 1000), (1024, 1024), (1000, 1000)):
+        for exp in range(12):
+            for b in (cutoff * base**exp, 2**(10 * exp), 10**(3 * exp)):
+                for fudge in (-1, 0, 1):
+                    yield check_threshold, b + fudge, base, cutoff
+
+
 def generate():
     import pprint
 
@@ -0,0 +1,168 @@
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from builtins import *
+
+import os
+import shutil
+import tempfile
+
+from nose.tools import raises
+
+from bytesize import Quantity, disk_usage, walk_usage, usage
+from test_cli import run
+
+
+def make_tree():
+    """A temporary directory with files of known sizes, a hard link and a
+    symbolic link
+    """
+    root = tempfile.mkdtemp()
+    for directory in ('a', 'a/b', 'c'):
+        os.mkdir(os.path.join(root, directory))
+    for path, size in (('x', 100), ('a/y', 2000), ('a/b/z', 30000), ('c/w', 5)):
+        with open(os.path.join(root, path), 'wb') as ff:
+            ff.write(b'.' * size)
+    os.link(os.path.join(root, 'a/b/z'), os.path.join(root, 'c/z'))
+    os.symlink('a/b/z', os.path.join(root, 'link'))
+    return root
+
+
+def test_disk_usage():
+    root = make_tree()
+    try:
+        def size(path):
+            return os.lstat(os.path.join(root, path)).st_size
+
+        directories = {path: size(path) for path in ('', 'a', 'a/b', 'c')}
+        expected = 100 + 2000 + 30000 + 5 + size('link') + sum(directories.values())
+        for threads in (None, 1, 3):
+            assert disk_usage(root, apparent_size=True, threads=threads) == expected
+        assert isinstance(disk_usage(root), Quantity)
+        assert disk_usage(root) >= Quantity(4096 * 3)
+        assert disk_usage(os.path.join(root, 'x'), apparent_size=True) == 100
+
+        usage = list(walk_usage(root, apparent_size=True))
+        assert [path for path, _ in usage] == [
+            os.path.join(root, path) for path in ('a/b', 'a', 'c')] + [root]
+        sizes = {os.path.relpath(path, root): value for path, value in usage}
+        # the hard link is counted in the directory first by name
+        assert sizes['a/b'] == 30000 + directories['a/b']
+        assert sizes['a'] == 2000 + 30000 + directories['a'] + directories['a/b']
+        assert sizes['c'] == 5 + directories['c']
+        assert usage[-1][1] == expected
+
+        assert list(walk_usage(root, apparent_size=True, max_depth=0)) == [(root, expected)]
+        seen = set()
+        assert list(walk_usage(os.path.join(root, 'a/b'), apparent_size=True, seen=seen))[-1][1] \
+            == sizes['a/b']
+        assert list(walk_usage(os.path.join(root, 'c'), apparent_size=True, seen=seen))[-1][1] \
+            == sizes['c']
+        assert list(walk_usage(os.path.join(root, 'c/z'), apparent_size=True, seen=seen)) \
+            == [(os.path.join(root, 'c/z'), 0)]
+        assert len(list(walk_usage(root, max_depth=1))) == 3
+    finally:
+        shutil.rmtree(root)
+
+
+@raises(OSError)
+def test_disk_usage_missing():
+    disk_usage(os.path.join(tempfile.gettempdir(), 'bytesize-no-such-file'))
+
+
+def test_disk_usage_cache():
+    root = make_tree()
+    cache = tempfile.mktemp(suffix='.db')
+    listed = []
+
+    def list_(path):
+        listed.append(os.path.relpath(path, root))
+        return list_.original(path)
+
+    list_.original, usage._list = usage._list, list_
+    racy_seconds, usage._UsageCache.racy_seconds = usage._UsageCache.racy_seconds, -60
+    try:
+        def check(expected_listed):
+            expected = list(walk_usage(root, apparent_size=True))
+            del listed[:]
+            assert list(walk_usage(root, apparent_size=True, cache=cache)) == expected
+            assert sorted(listed) == sorted(expected_listed)
+
+        check(['.', 'a', 'a/b', 'c'])
+        check([])
+        # the cache of sizes on disk is separate
+        expected = disk_usage(root)
+        del listed[:]
+        assert disk_usage(root, cache=cache) == expected
+        assert len(listed) == 4
+
+        with open(os.path.join(root, 'a/b/new'), 'wb') as ff:
+            ff.write(b'.' * 12345)
+        check(['a/b'])
+
+        os.mkdir(os.path.join(root, 'c/d'))
+        os.mkdir(os.path.join(root, 'c/d/e'))
+        check(['c', 'c/d', 'c/d/e'])
+
+        shutil.rmtree(os.path.join(root, 'c/d'))
+        check(['c'])
+        assert usage._UsageCache(cache, True).get(os.path.join(root, 'c/d/e'),
+                                                  os.lstat(root)) is None
+
+        os.rename(os.path.join(root, 'a/b'), os.path.join(root, 'b'))
+        check(['.', 'a', 'b'])
+        check([])
+    finally:
+        usage._list = list_.original
+        usage._UsageCache.racy_seconds = racy_seconds
+        shutil.rmtree(root)
+        os.remove(cache)
+
+
+def test_du_command():
+    root = make_tree()
+    try:
+        status, output, errors = run(['du', '-b', '--format', 'd', root], b'')
+        assert (status, errors) == (0, '')
+        lines = output.decode().splitlines()
+        assert [line.split('\t')[1] for line in lines] == [
+            os.path.join(root, path) for path in ('a/b', 'a', 'c')] + [root]
+        assert lines[-1] == '{:d}\t{}'.format(disk_usage(root, apparent_size=True), root)
+
+        status, output, _ = run(['du', '-s', '-c', '-b', '--format', 'a',
+                                 os.path.join(root, 'a'), os.path.join(root, 'x')], b'')
+        assert output.decode().splitlines()[1:] == ['100 B\t' + os.path.join(root, 'x'),
+                                                     '{:a}\ttotal'.format(Quantity(
+                                                         disk_usage(os.path.join(root, 'a'),
+                                                                    apparent_size=True) + 100))]
+
+        # a file linked from both paths counts only under the first
+        status, output, _ = run(['du', '-s', '-c', '-b', '--format', 'd',
+                                 os.path.join(root, 'a'), os.path.join(root, 'c'),
+                                 os.path.join(root, 'c', 'z')], b'')
+        sizes = [line.split('\t')[0] for line in output.decode().splitlines()]
+        a_size = disk_usage(os.path.join(root, 'a'), apparent_size=True)
+        c_size = disk_usage(os.path.join(root, 'c'), apparent_size=True) - 30000
+        assert sizes == ['{:d}'.format(a_size), '{:d}'.format(c_size), '0 B',
+                         '{:d}'.format(a_size + c_size)]
+
+        cache = tempfile.mktemp(suffix='.db')
+        try:
+            expected = run(['du', root], b'')[1]
+            assert run(['du', '--cache', cache, os.path.join(root, 'c')], b'')[0] == 0
+            assert run(['du', '--cache', cache, root], b'')[1] == expected
+        finally:
+            os.remove(cache)
+
+        status, output, errors = run(['du', '-s', os.path.join(root, 'missing')], b'')
+        assert (status, output) == (1, b'')
+        assert errors.startswith('bytesize du: ')
+    finally:
+        shutil.rmtree(root)
+
+
+def test_du_bad_arguments():
+    @raises(SystemExit)
+    def check(argv):
+        run(['du'] + argv, b'')
+
+    for argv in (['--format', 'z'], ['-d', '-1'], ['-s', '-d', '1'], ['-t', '0']):
+        yield check, argv